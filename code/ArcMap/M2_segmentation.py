@@ -30,8 +30,17 @@ Last update on 17 MAY 2024
 import os
 import sys
 import math
+import numpy as np
 import arcpy
 
+#toolbox helper modules stored next to the moduls
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from SCS_utils import GetOptionalParameter, FillHollows, ReadRings, WriteGeometries, ArraysToGeometry
+from SCS_overlay import UnionAll
+from SCS_scratch import ScratchSetup, Scratch, ScratchCleanup
+from SCS_segment import SplitMidpoints, BoundedVoronoi, STRTree, STRQuery, ChannelTiles, SimplifyPaths, SimplificationSweep
+import SCS_segment
+
 #-----------------------------------------------------
 # Local variables and input
 # input
@@ -42,6 +51,15 @@ field_year =arcpy.GetParameterAsText(3)
 interval = arcpy.GetParameter(4) 
 simplification = arcpy.GetParameter(5) 
 deleteTF = arcpy.GetParameter(6)
+#optional input: temporary files in MEMORY (spilled to disk for input data larger than size in MB) or on DISK
+scratch_mode = GetOptionalParameter(7, "MEMORY").upper()
+scratch_size = GetOptionalParameter(8, 512.0)
+#optional input: other intervals of segments calculated in the same run (list separated by ";")
+interval_list = GetOptionalParameter(9, "")
+#optional input: simplification of centerline by INTEGRATE (arcpy), DOUGLAS_PEUCKER or VISVALINGAM (area tolerance^2)
+simplify_mode = GetOptionalParameter(10, "INTEGRATE").upper()
+#optional input: tolerances of simplification reported with vertex count of centerline (list separated by ";")
+sweep_list = GetOptionalParameter(11, "")
 
 #local
 ws = output_folder.replace(os.sep, '/')
@@ -58,168 +76,190 @@ EA_layer = []
 year_list = []
 UNI_polygon = []
 
+intervals = [interval]
+for value in interval_list.replace(" ", ";").split(";"):
+    if value == "":
+        continue
+    value = float(value.replace(",", "."))
+    if value == int(value):
+        value = int(value)
+    if value not in intervals:
+        intervals.append(value)
+
+ScratchSetup(scratch_mode, scratch_size, channel_layer + [inputCenterline])
 
 
 #===============================================================================
 # CODING
 #===============================================================================
 
+# MAIN PROGRAM DEFINITION
+# Channel pieces DEF
+def ChannelPieces (channel, tile_size):
+    """
+    This function cuts channel polygon to tiles and creates STR tree of the tile extents. \n
+    Vars:\n
+    \t channel = channel polygon without hollows \n
+    \t tile_size = size of channel tiles \n
+    RETURNS: pieces = (channel geometry, list of channel pieces, STR tree of pieces)
+    """
+    shapes = [row[0] for row in arcpy.da.SearchCursor(channel, ["SHAPE@"]) if row[0] is not None]
+    channel_shape = shapes[0]
+    for shape in shapes[1:]:
+        channel_shape = channel_shape.union(shape)
+
+    #channel pieces in tiles and STR tree of piece extents
+    xy, offsets, feature = ReadRings(channel)
+    pieces = []
+    boxes = []
+    for box in ChannelTiles(xy, offsets, tile_size):
+        piece = channel_shape.clip(arcpy.Extent(box[0], box[1], box[2], box[3]))
+        if piece is not None and piece.area > 0:
+            pieces.append(piece)
+            e = piece.extent
+            boxes.append([e.XMin, e.YMin, e.XMax, e.YMax])
+    return channel_shape, pieces, STRTree(boxes)
+
+# Segment polygons DEF
+def SegmentPolygons (midpoints, rows, channel_pieces, out_fc):
+    """
+    This function creates channel segments as Voronoi cells of midpoints clipped by the channel polygon. \n
+    Every cell is clipped only by channel pieces found in STR tree of the piece extents. \n
+    Vars:\n
+    \t midpoints = array (n, 2) of midpoints of centerline pieces \n
+    \t rows = list of attribute values [Distance, ID_SEQ] of every midpoint \n
+    \t channel_pieces = result of ChannelPieces \n
+    \t out_fc = output segments \n
+    RETURNS: out_fc = output segments
+    """
+    channel_shape, pieces, tree = channel_pieces
+
+    #Voronoi cells bounded by channel envelope
+    e = channel_shape.extent
+    margin = 0.01 * max(e.width, e.height)
+    cells = BoundedVoronoi(midpoints, [e.XMin - margin, e.YMin - margin, e.XMax + margin, e.YMax + margin])
+    segments = []
+    segment_rows = []
+    for cell, row in zip(cells, rows):
+        cell_shape = arcpy.Polygon(arcpy.Array([arcpy.Point(x, y) for x, y in cell]), SR)
+        parts = []
+        for n in STRQuery(tree, [cell[:, 0].min(), cell[:, 1].min(), cell[:, 0].max(), cell[:, 1].max()]):
+            part = cell_shape.intersect(pieces[n], 4)
+            if part.area > 0:
+                parts.append(part)
+        if len(parts) == 0:
+            continue
+        segment = parts[0]
+        for part in parts[1:]:
+            segment = segment.union(part)
+        segments.append(segment)
+        segment_rows.append(row)
+    return WriteGeometries(out_fc, "POLYGON", SR, segments, [("Distance", "LONG"), ("ID_SEQ", "LONG")], segment_rows)
+
 #----------------------------------------------------
 # MAIN PROGRAM
 #----------------------------------------------------
 
-#STEP 1 copy layers with the name of the year extracted from atribute table
-arcpy.AddMessage("STEP 1 Preprocessing polygons")
-for fclist in channel_layer:
-    fields_search = [f.name for f in arcpy.ListFields(fclist)]
-    for field in fields_search:
-        if field == field_year:
-            field_check = field
-    with arcpy.da.SearchCursor(fclist, field_check) as cursor:
-        for row in cursor:
-            year = row [0]
-    newName = "CH_"+ str(year) + ".shp"
-    year_list.append(year)
-    arcpy.management.CopyFeatures (fclist,newName)
-    EA_layer.append(newName)
-
-#STEP 2 union all channel layer
-arcpy.AddMessage("STEP 2 Create union of all polygons")
-union_pol = arcpy.analysis.Union(EA_layer, "%ScratchWorkspace%\\union_pol", "ALL")
-arcpy.management.AddField(union_pol, "DISS", "SHORT")
-with arcpy.da.UpdateCursor(union_pol, "DISS") as cursor:
-    for row in cursor:
-        row[0] = 1
-        cursor.updateRow(row)
-union_pol2 = arcpy.management.Dissolve(union_pol, "%ScratchWorkspace%\\union_pol2", "DISS")
-
-#STEP 3 fill holow (create union channel without holow polygon)
-arcpy.AddMessage("STEP 3 Converting union of polygons to union without hollows")
-with arcpy.da.UpdateCursor(union_pol2, ["SHAPE@"]) as updateCursor:
-    for updateRow in updateCursor:
-        shape = updateRow[0]
-        new_shape = arcpy.Array()
-        for part in shape:
-            new_part = arcpy.Array()
-            #get the first None point index
-            first_null_point_index = 0
-            for i in range(len(part)):
-                if part[i] == None:
-                    first_null_point_index = i
-                    break
-            if first_null_point_index == 0:
-                new_shape.add(part)
-            else:
-                for j in range(first_null_point_index):
-                    new_part.add(part[j])
-            new_shape.add(new_part)
-        if len(new_shape) > 0:
-            new_poly = arcpy.Polygon(new_shape)
-            name_pol= "union_channel.shp"
-            arcpy.management.CopyFeatures (new_poly,name_pol)
-            arcpy.management.DefineProjection(name_pol, SR)
-        else:
-            arcpy.management.CopyFeatures (union_pol2,name_pol)
-            arcpy.management.DefineProjection(name_pol, SR)
-        updateCursor.updateRow(updateRow)
-
-channel = name_pol
-
-#STEP 4 Simplification centerline if is defined in output
-if simplification == 0:
-    centro = arcpy.management.CopyFeatures (inputCenterline, "%ScratchWorkspace%\\centro")
-else:
-    arcpy.AddMessage("Simplification of centerline")
-    centro = arcpy.management.CopyFeatures (inputCenterline, "centro_simple_{}m.shp".format(simplification))
-    arcpy.management.Integrate(centro, simplification)
+try:
+    #STEP 1 copy layers with the name of the year extracted from atribute table
+    arcpy.AddMessage("STEP 1 Preprocessing polygons")
+    for fclist in channel_layer:
+        fields_search = [f.name for f in arcpy.ListFields(fclist)]
+        for field in fields_search:
+            if field == field_year:
+                field_check = field
+        with arcpy.da.SearchCursor(fclist, field_check) as cursor:
+            for row in cursor:
+                year = row [0]
+        newName = "CH_"+ str(year) + ".shp"
+        year_list.append(year)
+        arcpy.management.CopyFeatures (fclist,newName)
+        EA_layer.append(newName)
+
+    #STEP 2 union all channel layer
+    arcpy.AddMessage("STEP 2 Create union of all polygons")
+    #channels of all years merged to one polygon by cascaded union (no overlay of layers needed)
+    union_pol2 = UnionAll(EA_layer, Scratch("union_pol2"), SR)
+
+    #STEP 3 fill holow (create union channel without holow polygon)
+    arcpy.AddMessage("STEP 3 Converting union of polygons to union without hollows")
+    name_pol = FillHollows(union_pol2, "union_channel.shp", SR)
+
+    channel = name_pol
+
+    #STEP 4 Simplification centerline if is defined in output
+    xy, offsets, feature = ReadRings(inputCenterline)
+    if sweep_list != "":
+        #vertex count of centerline for tolerances of simplification
+        tolerances = [float(value.replace(",", ".")) for value in sweep_list.replace(" ", ";").split(";") if value != ""]
+        method = "VISVALINGAM" if simplify_mode == "VISVALINGAM" else "DOUGLAS_PEUCKER"
+        counts = SimplificationSweep(xy, offsets, tolerances, method)
+        arcpy.AddMessage("Simplification {} of centerline with {} vertices:".format(method, len(xy)))
+        for tolerance, count in zip(tolerances, counts):
+            arcpy.AddMessage("   tolerance {} m: {} vertices ({:.1f} %)".format(tolerance, count, 100.0 * count / max(len(xy), 1)))
+    if simplification != 0 and simplify_mode == "INTEGRATE":
+        arcpy.AddMessage("Simplification of centerline")
+        centro = arcpy.management.CopyFeatures (inputCenterline, "centro_simple_{}m.shp".format(simplification))
+        arcpy.management.Integrate(centro, simplification)
+        xy, offsets, feature = ReadRings(centro)
+    elif simplification != 0:
+        arcpy.AddMessage("Simplification of centerline ({})".format(simplify_mode))
+        xy, offsets = SimplifyPaths(xy, offsets, simplification, simplify_mode)
+        #paths of every centerline feature in one polyline
+        lines = [ArraysToGeometry([xy[offsets[i]:offsets[i + 1]] for i in np.flatnonzero(feature == n)], "POLYLINE") for n in np.unique(feature)]
+        centro = WriteGeometries("centro_simple_{}m.shp".format(simplification), "POLYLINE", SR, lines)
     
 
-#STEP 5 Split centerline in defined interval 
-arcpy.AddMessage("STEP 4 Create longitudinal segments....")
-clipPoints = arcpy.management.GeneratePointsAlongLines(centro, "%ScratchWorkspace%\\clipPoints", "DISTANCE", interval, "","END_POINTS")
-arcpy.management.AddField(clipPoints, "Distance", "LONG")
-arcpy.management.AddField(clipPoints, "seg_rev", "SHORT")
-
-all_rows = [i[0] for i in arcpy.da.SearchCursor(clipPoints,"OID@")]
-max_val = max(all_rows)
-with arcpy.da.UpdateCursor(clipPoints, ["OID@","Distance", "seg_rev"]) as cursor:
-    for row in cursor:
-        row[1] = interval
-        row[2] = max_val - row[0]
-        cursor.updateRow(row)
-
-if interval > 2:
-    rad = "{} meters".format(1)
-else:
-    rad = "{} meters".format(interval/5)
-centerlinePointsCLIP = arcpy.management.SplitLineAtPoint(centro, clipPoints, "%ScratchWorkspace%\\centerlinePointsCLIP", rad)
-
-#STEP 6 Combine split line centerline with sequenced points
-fm = arcpy.FieldMappings()
-fm.addTable(clipPoints)
-IDIndex = fm.findFieldMapIndex("seg_rev")
-fieldmap = fm.getFieldMap(IDIndex)
-field = fieldmap.outputField
-field.name = "ID_SEQ"
-field.aliasName = "ID_SEQ"
-fieldmap.outputField = field
-fieldmap.mergeRule = "Max"
-fm.replaceFieldMap(IDIndex, fieldmap)
-
-centerSeg = arcpy.analysis.SpatialJoin(centerlinePointsCLIP, clipPoints, "%ScratchWorkspace%\\centerSeg", "JOIN_ONE_TO_ONE", "",fm, "CONTAINS")
-
-#STEP 7 Create midpoints of centerline and Thiessen polygon from this midpoints 
-centreMidpoint = arcpy.FeatureVerticesToPoints_management(centerSeg, "%ScratchWorkspace%\\centreMidpoint", "MID")
-
-desc = arcpy.Describe(channel)
-extent = desc.extent
-    
-ext = str(extent).split(" ")
-Xmin = float(ext[0].replace(",","."))
-Ymin = float(ext[1].replace(",","."))
-Xmax = float(ext[2].replace(",","."))
-Ymax = float(ext[3].replace(",","."))
-    
-chaine = str(Xmin) + " " + str(Ymin) + " " + str(Xmax) + " " + str(Ymax)
-
-arcpy.env.extent = chaine
-
-midPointThiessen = arcpy.CreateThiessenPolygons_analysis(centreMidpoint, "midPointThiessen", "ALL")
-
-#STEP 8 create segment 
-SegmentClip = arcpy.Clip_analysis(midPointThiessen, channel, "%ScratchWorkspace%\\SegmentClip")
-
-fld = ["Distance", "ID_SEQ"]
-fields_to_delete = [field.name for field in arcpy.ListFields(SegmentClip) if not field.required and field.name not in fld]
-fields_to_delete.pop() 
-for field in fields_to_delete:
-    arcpy.DeleteField_management(SegmentClip, field)
-
-name = "Segments_{}m.shp".format(interval)
-arcpy.management.CopyFeatures (SegmentClip,name)
-arcpy.management.DefineProjection(name, SR)
-
-#===============================================================================
-# DELETING processing FILES
-#===============================================================================
-if deleteTF == True:
-    arcpy.AddMessage("Deleting processing files")
-    arcpy.Delete_management(channel)
-    for i in range(len(EA_layer)):
-        arcpy.Delete_management(EA_layer[i])
-else:
-     arcpy.AddMessage("Processing files preserved in output folder")
-
-#===============================================================================
-# DELETING TEMPORARY FILES
-#===============================================================================
-arcpy.Delete_management(union_pol)
-arcpy.Delete_management(union_pol2)
-arcpy.Delete_management(clipPoints)
-arcpy.Delete_management(centerlinePointsCLIP)
-arcpy.Delete_management(centerSeg)
-arcpy.Delete_management(centreMidpoint)
-arcpy.Delete_management(SegmentClip)
-arcpy.Delete_management(midPointThiessen)
-if simplification == 0:
-    arcpy.Delete_management(centro)
\ No newline at end of file
+    #STEP 5 Split centerline in defined interval (linear referencing of centerline vertices)
+    arcpy.AddMessage("STEP 4 Create longitudinal segments....")
+    if SCS_segment.Voronoi is not None:
+        #channel tiles shared by all intervals
+        channel_pieces = ChannelPieces(channel, 10 * min(intervals))
+    for interval in intervals:
+        arcpy.AddMessage("Segments {} m".format(interval))
+        midpoints, ids = SplitMidpoints(xy, offsets, interval)
+
+        #STEP 6 Combine split line centerline with sequenced numbers (reversed order, last segment ID_SEQ = 1)
+        rows = [[interval, int(n)] for n in ids]
+
+        #STEP 7 Create Voronoi (Thiessen) polygons from midpoints of centerline pieces
+        name = "Segments_{}m.shp".format(interval)
+        if SCS_segment.Voronoi is not None:
+            #STEP 8 create segment (bounded Voronoi cells clipped by channel tiles)
+            SegmentPolygons(midpoints, rows, channel_pieces, name)
+        else:
+            #Thiessen polygons in the extent of the channel
+            points = [arcpy.PointGeometry(arcpy.Point(x, y), SR) for x, y in midpoints]
+            centreMidpoint = WriteGeometries(Scratch("centreMidpoint"), "POINT", SR, points, [("Distance", "LONG"), ("ID_SEQ", "LONG")], rows)
+            extent_old = arcpy.env.extent
+            arcpy.env.extent = arcpy.Describe(channel).extent
+            try:
+                midPointThiessen = arcpy.CreateThiessenPolygons_analysis(centreMidpoint, Scratch("midPointThiessen"), "ALL")
+            finally:
+                arcpy.env.extent = extent_old
+
+            #STEP 8 create segment 
+            SegmentClip = arcpy.Clip_analysis(midPointThiessen, channel, Scratch("SegmentClip"))
+
+            fld = ["Distance", "ID_SEQ"]
+            fields_to_delete = [field.name for field in arcpy.ListFields(SegmentClip) if not field.required and field.name not in fld]
+            fields_to_delete.pop() 
+            for field in fields_to_delete:
+                arcpy.DeleteField_management(SegmentClip, field)
+
+            arcpy.management.CopyFeatures (SegmentClip,name)
+            arcpy.management.DefineProjection(name, SR)
+
+    #===============================================================================
+    # DELETING processing FILES
+    #===============================================================================
+    if deleteTF == True:
+        arcpy.AddMessage("Deleting processing files")
+        arcpy.Delete_management(channel)
+        for i in range(len(EA_layer)):
+            arcpy.Delete_management(EA_layer[i])
+    else:
+         arcpy.AddMessage("Processing files preserved in output folder")
+finally:
+    #temporary files deleted also when the modul fails
+    ScratchCleanup()
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_cache is an open-source python and arcPy code.
+          Persistent cache of centerlines on disk. Key of the centerline is hash of the polygon coordinates,
+          spatial reference, centerline parameters and code of the centerline engine, so unchanged
+          polygons are not calculated again. Cache size is limited, least recently used centerlines are removed.
+          Manifest of the artifacts of the modul (JSON file in output folder) stores keys of inputs of the
+          outputs, so incremental run calculates only outputs with new or changed inputs.
+
+'''
+
+# required libraries and packages
+import os
+import json
+import hashlib
+import numpy as np
+import arcpy
+
+from SCS_utils import ReadRings, ArraysToGeometry, WriteGeometries
+
+#code of the centerline calculation is part of the key (changed code = new centerlines)
+ENGINE_FILES = ["SCS_centerline.py", "SCS_skeleton.py", "SCS_utils.py"]
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Cache key DEF
+def CenterlineKey (channel, options):
+    """
+    This function calculates cache key of the centerline. \n
+    Vars:\n
+    \t channel = polygon \n
+    \t options = dictionary of centerline parameters \n
+    RETURNS: key = hexadecimal hash
+    """
+    xy, offsets, feature = ReadRings(channel)
+    sr = arcpy.Describe(channel).spatialReference.exportToString()
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(xy).tobytes())
+    h.update(np.ascontiguousarray(offsets).tobytes())
+    h.update(np.ascontiguousarray(feature).tobytes())
+    h.update(sr.encode("utf-8"))
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in ENGINE_FILES:
+        with open(os.path.join(folder, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# Cache read DEF
+def CacheGet (folder, key, out_fc, spatial_reference):
+    """
+    This function writes cached centerline to feature class. \n
+    Vars:\n
+    \t folder = cache folder \n
+    \t key = cache key \n
+    \t out_fc = output feature class \n
+    \t spatial_reference = spatial reference of the output \n
+    RETURNS: out_fc = output feature class or None if centerline is not in cache
+    """
+    path = os.path.join(folder, key + ".npz")
+    if not os.path.exists(path):
+        return None
+    try:
+        data = np.load(path)
+        xy, offsets, feature = data["xy"], data["offsets"], data["feature"]
+        data.close()
+        #recently used
+        os.utime(path, None)
+    except (IOError, OSError, ValueError, KeyError):
+        return None
+    lines = []
+    for n in np.unique(feature):
+        lines.append(ArraysToGeometry([xy[offsets[r]:offsets[r + 1]] for r in np.nonzero(feature == n)[0]], "POLYLINE"))
+    return WriteGeometries(out_fc, "POLYLINE", spatial_reference, lines, [("Centerln", "TEXT")], [["centerline"] for line in lines])
+
+# Cache write DEF
+def CachePut (folder, key, centerline, max_size):
+    """
+    This function stores centerline in the cache and removes least recently used centerlines above cache size. \n
+    Vars:\n
+    \t folder = cache folder, created if not exists \n
+    \t key = cache key \n
+    \t centerline = centerline feature class \n
+    \t max_size = maximal size of the cache in MB \n
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    xy, offsets, feature = ReadRings(centerline)
+    path = os.path.join(folder, key + ".npz")
+    temp = os.path.join(folder, "{}_{}.tmp.npz".format(key, os.getpid()))
+    np.savez_compressed(temp, xy=xy, offsets=offsets, feature=feature)
+    try:
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp, path)
+    except OSError:
+        #same centerline stored by other worker
+        os.remove(temp)
+    CacheEvict(folder, max_size)
+
+# Cache eviction DEF
+def CacheEvict (folder, max_size):
+    """
+    This function removes least recently used centerlines until the cache is smaller than max_size. \n
+    Vars:\n
+    \t folder = cache folder \n
+    \t max_size = maximal size of the cache in MB \n
+    """
+    entries = []
+    for name in os.listdir(folder):
+        if name.endswith(".npz") and not name.endswith(".tmp.npz"):
+            path = os.path.join(folder, name)
+            try:
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+            except OSError:
+                continue
+    entries.sort()
+    total = sum(entry[1] for entry in entries)
+    limit = max_size * 1024 * 1024
+    for mtime, size, path in entries:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
+
+# Layer key DEF
+def LayerKey (layers, options=None, files=None):
+    """
+    This function calculates key of the inputs (hash of coordinates and spatial reference of layers, parameters and code). \n
+    Vars:\n
+    \t layers = list of layers \n
+    \t options = JSON serializable parameters \n
+    \t files = list of code files of the toolbox folder \n
+    RETURNS: key = hexadecimal hash
+    """
+    h = hashlib.sha1()
+    for layer in layers:
+        xy, offsets, feature = ReadRings(layer)
+        h.update(np.ascontiguousarray(xy).tobytes())
+        h.update(np.ascontiguousarray(offsets).tobytes())
+        h.update(np.ascontiguousarray(feature).tobytes())
+        h.update(arcpy.Describe(layer).spatialReference.exportToString().encode("utf-8"))
+    h.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    folder = os.path.dirname(os.path.abspath(__file__))
+    for name in files or []:
+        with open(os.path.join(folder, name), "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+# Manifest DEF
+def ManifestRead (path):
+    """
+    This function reads manifest of the artifacts. \n
+    Vars:\n
+    \t path = manifest file \n
+    RETURNS: manifest = dictionary (empty if manifest does not exist or is damaged)
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+def ManifestWrite (path, manifest):
+    """
+    This function writes manifest of the artifacts (replaced at once, damaged manifest is never left). \n
+    Vars:\n
+    \t path = manifest file \n
+    \t manifest = dictionary \n
+    """
+    temp = "{}.{}.tmp".format(path, os.getpid())
+    with open(temp, "w") as f:
+        json.dump(manifest, f, sort_keys=True, indent=1)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp, path)
+
+def ManifestMerge (path, manifest):
+    """
+    This function merges new keys to the manifest of the artifacts (keys of years and periods not calculated are kept). \n
+    Vars:\n
+    \t path = manifest file \n
+    \t manifest = dictionary, dictionary values merged with stored dictionaries, other values replaced \n
+    """
+    merged = ManifestRead(path)
+    for key, value in manifest.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key].update(value)
+        else:
+            merged[key] = value
+    ManifestWrite(path, merged)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_centerline is an open-source python and arcPy code.
+          Centerline detection of Modul1_Centerline (Centro). Stored outside of the modul so the
+          centerlines can be calculated also in worker processes (see SCS_parallel).
+
+'''
+
+# required libraries and packages
+import os
+import math
+import numpy as np
+import arcpy
+
+from SCS_utils import ReadRings, ArraysToGeometry, WriteGeometries
+from SCS_cache import CenterlineKey, CacheGet, CachePut
+from SCS_scratch import ScratchSetup, Scratch, ScratchCleanup
+import SCS_skeleton
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Centerline detection DEF
+def Centro (channel, engine="THIESSEN", angle_min=50.0, angle_max=130.0, densify_mode="REGULAR", vertex_budget=200000, branch_length=0.0, keep_longest=False, tile_length=0.0, tile_overlap=-1.0, workers=1):
+     """
+     This function calculates centerline for the polygon evelope. \n
+     Vars:\n
+     \t channel = polygon \n
+     \t engine = VORONOI (in-memory skeleton) or THIESSEN (geoprocessing chain) \n
+     \t angle_min, angle_max = kept range of angle difference between centerline edge and direction to the nearest bank \n
+     \t densify_mode = REGULAR (perimeter / vertex count) or ADAPTIVE (channel width and curvature) \n
+     \t vertex_budget = maximal number of vertices for ADAPTIVE densification \n
+     \t branch_length = minimal length of side branch of the centerline (negative = channel width, 0 = no pruning) \n
+     \t keep_longest = keep only the main channel path \n
+     \t tile_length = length of tiles along the long axis of the polygon for very long reaches (0 = no tiling, VORONOI only) \n
+     \t tile_overlap = overlap of neighbouring tiles (negative = 3 x channel width) \n
+     \t workers = number of worker processes for tiles \n
+     RETURNS: centerline = line feature
+     """
+     if engine == "VORONOI":
+         #in-memory skeleton from densified vertices (no intermediate datasets)
+         xy, offsets, feature = ReadRings(channel)
+         if densify_mode == "ADAPTIVE":
+             xy, offsets = SCS_skeleton.AdaptiveDensifyRings(xy, offsets, vertex_budget)
+             density = SCS_skeleton.RingsLength(xy, offsets) / len(xy)
+         else:
+             density = SCS_skeleton.RingsLength(xy, offsets) / len(xy)
+             xy, offsets = SCS_skeleton.DensifyRings(xy, offsets, density)
+         if branch_length < 0:
+             branch_length = SCS_skeleton.ChannelWidth(xy, offsets)
+         if tile_length > 0:
+             #very long reach: skeleton of overlapping tiles stitched to one centerline
+             if tile_overlap < 0:
+                 tile_overlap = 3 * SCS_skeleton.ChannelWidth(xy, offsets)
+             parts = SCS_skeleton.TiledSkeletonCenterline(xy, offsets, density, tile_length, tile_overlap, angle_min, angle_max, branch_length, keep_longest, workers)
+         else:
+             parts = SCS_skeleton.SkeletonCenterline(xy, offsets, density, angle_min, angle_max, branch_length, keep_longest)
+         lines = [ArraysToGeometry(part, "POLYLINE") for part in parts]
+         rows = [["centerline"] for part in parts]
+         centerline2 = WriteGeometries("centerline2.shp", "POLYLINE", arcpy.Describe(channel).spatialReference, lines, [("Centerln", "TEXT")], rows)
+         return centerline2
+
+     #import and pre-process channel data (densify polygons with regular distribution of vertices)
+     poly = arcpy.management.CopyFeatures (channel, Scratch("poly"))
+     polyPOINT = arcpy.management.FeatureVerticesToPoints(poly, Scratch("polyPOINT"))
+     vert_count = float(arcpy.GetCount_management(polyPOINT).getOutput(0))
+     poly_lenght = float(sum(row[0] for row in arcpy.da.SearchCursor(poly, 'SHAPE@LENGTH')))
+     density = (poly_lenght / vert_count)
+     if densify_mode == "ADAPTIVE":
+         #vertices placed by channel width and bank curvature, total count limited by vertex budget
+         xy, offsets, feature = ReadRings(poly)
+         xy, offsets = SCS_skeleton.AdaptiveDensifyRings(xy, offsets, vertex_budget)
+         density = SCS_skeleton.RingsLength(xy, offsets) / len(xy)
+         with arcpy.da.UpdateCursor(poly, ["SHAPE@"]) as cursor:
+             for n, row in enumerate(cursor):
+                 rings = [xy[offsets[r]:offsets[r + 1]] for r in np.nonzero(feature == n)[0]]
+                 row[0] = ArraysToGeometry(rings, "POLYGON")
+                 cursor.updateRow(row)
+     else:
+         arcpy.edit.Densify(poly, "DISTANCE", density)
+     polyToLine = arcpy.management.PolygonToLine(poly, Scratch("polyToLine"))
+
+     #create Thessen polygons  
+     polyPOINT2 = arcpy.management.FeatureVerticesToPoints(poly, Scratch("polyPOINT2"))
+     ThiessenPOLY = arcpy.analysis.CreateThiessenPolygons(polyPOINT2, Scratch("ThiessenPOLY"))
+     Thiessen = arcpy.analysis.Clip(ThiessenPOLY, poly, Scratch("Thiessen"))
+
+     #selection of the Thiessen line near the centerline of the polygon (with errors and small line)
+     ThiessenToline = arcpy.management.PolygonToLine(Thiessen, Scratch("ThiessenToline"))
+     thiesTL = arcpy.MakeFeatureLayer_management(ThiessenToline)
+     polyTL = arcpy.MakeFeatureLayer_management(polyToLine)
+     thiessenSelect = arcpy.management.SelectLayerByLocation(thiesTL, "INTERSECT", polyTL, "", "NEW_SELECTION", "INVERT")
+     rawCenter = arcpy.MakeFeatureLayer_management(thiessenSelect) 
+
+     #Thiessen cenerline raw cleaning by removing all lines perpedicular to channel banks
+     if SCS_skeleton.Voronoi is not None:
+       #batch angle filter for all lines from coordinate arrays
+       shapes = [row[0] for row in arcpy.da.SearchCursor(rawCenter, ["SHAPE@"])]
+       first = np.array([[shape.firstPoint.X, shape.firstPoint.Y] for shape in shapes])
+       last = np.array([[shape.lastPoint.X, shape.lastPoint.Y] for shape in shapes])
+       xy, offsets, feature = ReadRings(poly)
+       diff = SCS_skeleton.BankAngleDifference(first, last, xy, offsets)
+       keep = np.nonzero((diff > angle_min) & (diff < angle_max))[0]
+       cleanCenter = WriteGeometries(Scratch("cleanCenter"), "POLYLINE", arcpy.Describe(poly).spatialReference, [shapes[n] for n in keep])
+     else:
+       arcpy.management.AddField(rawCenter, "ANGLE", "DOUBLE")
+       rows = arcpy.UpdateCursor(rawCenter)
+       shapeN = arcpy.Describe(rawCenter).shapeFieldName
+       for row in rows:
+         fc = row.getValue(shapeN)
+         dx = fc.lastPoint.X - fc.firstPoint.X
+         dy = fc.lastPoint.Y - fc.firstPoint.Y
+         radian = math.atan2(dy,dx)
+         degrees = radian * 180 / math.pi
+         if degrees >= 0:
+           Ang = degrees
+         else:
+           Ang = 180 - abs(degrees)
+         row.ANGLE = Ang
+         rows.updateRow(row)     
+      
+       arcpy.analysis.Near(rawCenter, polyToLine, "", "", "ANGLE",  "PLANAR")   
+       arcpy.management.AddField(rawCenter, "NEAR_edit", "DOUBLE")   
+       arcpy.management.AddField(rawCenter, "DIFF", "DOUBLE")
+       with arcpy.da.UpdateCursor(rawCenter, ("ANGLE","NEAR_ANGLE", "NEAR_edit", "DIFF")) as cursor:
+         for row in cursor:
+           if row[1] >= 0:
+               row[2] = row[1]
+           else:
+               row[2] = 180 - abs(row[1])
+           row[3] = abs(row[0] - row [2])
+           cursor.updateRow(row)
+       selectCenter = arcpy.management.SelectLayerByAttribute(rawCenter, "NEW_SELECTION",  '"DIFF" > {} and "DIFF" < {}'.format(angle_min, angle_max)) 
+       cleanCenter = arcpy.MakeFeatureLayer_management(selectCenter)   
+    
+     #Clean centerline from small unconnected line 
+     if SCS_skeleton.Voronoi is not None and (branch_length != 0 or keep_longest):
+         #skeleton graph of the lines: join close line ends, remove short side branches (only when pruning is requested)
+         lxy, loffsets, lfeature = ReadRings(cleanCenter)
+         nodes, edges = SCS_skeleton.LinesToGraph(lxy, loffsets, density / 1000.0)
+         edges = SCS_skeleton.CleanSkeleton(nodes, edges, density)
+         if branch_length < 0:
+             branch_length = SCS_skeleton.ChannelWidth(xy, offsets)
+         edges = SCS_skeleton.PruneSkeleton(nodes, edges, branch_length, keep_longest)
+         paths = SCS_skeleton.SkeletonPaths(len(nodes), edges)
+         parts = SCS_skeleton.GroupPaths(nodes, edges, paths, [nodes[path] for path in paths])
+         lines = [ArraysToGeometry(part, "POLYLINE") for part in parts]
+         centroDiss2 = WriteGeometries(Scratch("centroDiss2"), "POLYLINE", arcpy.Describe(poly).spatialReference, lines, [("DISS", "SHORT")], [[1] for part in parts])
+     else:
+         arcpy.management.AddField(cleanCenter, "DISS", "SHORT")
+         with arcpy.da.UpdateCursor(cleanCenter, "DISS") as cursor:
+             for row in cursor:
+                 row[0] = 1
+                 cursor.updateRow(row)
+         centroDiss = arcpy.management.Dissolve(cleanCenter, Scratch("centroDiss"), "DISS", "", "SINGLE_PART", "UNSPLIT_LINES")
+         with arcpy.da.UpdateCursor(centroDiss, ["SHAPE@"]) as updateCursor:
+             for row in updateCursor:
+                 shape = row[0]
+                 line = shape.getPart(0)
+                 ptscount = line.count
+                 if ptscount < 4:
+                     updateCursor.deleteRow()
+         tolerance = 1*density
+        
+         arcpy.management.Integrate(centroDiss, tolerance)
+         centroDiss2 = arcpy.management.Dissolve(centroDiss, Scratch("centroDiss2"), "DISS", "", "SINGLE_PART", "DISSOLVE_LINES")
+         arcpy.Delete_management(centroDiss)
+    
+     #extent line to the borders
+     arcpy.management.AddField(centroDiss2, "Centerln", "TEXT")
+     with arcpy.da.UpdateCursor(centroDiss2, "Centerln") as cursor:
+         for row in cursor:
+             row[0] = "centerline"
+             cursor.updateRow(row)
+     polyCentro = arcpy.Merge_management ([centroDiss2, polyTL], Scratch("polycentro"))
+     polyCentro2 = arcpy.management.CopyFeatures(polyCentro, "polyCentro2.shp") 
+     arcpy.edit.ExtendLine(polyCentro2, "", "FEATURE")
+     polyCentroATR = arcpy.MakeFeatureLayer_management(polyCentro2) 
+     selectpolyCenter = arcpy.management.SelectLayerByAttribute( polyCentroATR, "NEW_SELECTION", "Centerln = 'centerline'") 
+     centerline = arcpy.MakeFeatureLayer_management(selectpolyCenter)
+     centerline2 = arcpy.management.CopyFeatures (centerline,"centerline2.shp")
+
+     #===============================================================================
+     # DELETING TEMPORARY FILES (scratch datasets are deleted by the modul)
+     #===============================================================================
+     arcpy.Delete_management(cleanCenter)
+     arcpy.Delete_management(polyCentro2)
+     arcpy.Delete_management(centerline)
+        
+     return centerline2
+
+# Cached centerline DEF
+def CachedCentro (channel, options, cache_folder="", cache_size=0, workers=1):
+     """
+     This function returns centerline from the cache or calculates it and stores it in the cache. \n
+     Vars:\n
+     \t channel = polygon \n
+     \t options = dictionary of Centro parameters \n
+     \t cache_folder = folder of the centerline cache \n
+     \t cache_size = maximal size of the cache in MB (0 = cache not used) \n
+     \t workers = number of worker processes for tiles (not part of the cache key) \n
+     RETURNS: centerline = line feature
+     """
+     if cache_size <= 0 or cache_folder == "":
+         return Centro(channel, workers=workers, **options)
+     key = CenterlineKey(channel, options)
+     centerline = CacheGet(cache_folder, key, "centerline2.shp", arcpy.Describe(channel).spatialReference)
+     if centerline is None:
+         centerline = Centro(channel, workers=workers, **options)
+         CachePut(cache_folder, key, centerline, cache_size)
+     else:
+         arcpy.AddMessage("Centerline of {} taken from cache".format(channel))
+     return centerline
+
+# Centerline worker DEF
+def CentroWorker (channel, workspace, options, cache_folder="", cache_size=0):
+     """
+     This function calculates centerline in its own workspace (worker process of parallel calculation). \n
+     Vars:\n
+     \t channel = polygon (full path) \n
+     \t workspace = folder of the worker, created if not exists, with scratch.gdb for temporary files \n
+     \t options = dictionary of Centro parameters \n
+     \t cache_folder = folder of the centerline cache \n
+     \t cache_size = maximal size of the cache in MB (0 = cache not used) \n
+     RETURNS: centerline = path of the centerline2.shp in the worker workspace
+     """
+     if not os.path.exists(workspace):
+         os.makedirs(workspace)
+     scratch = os.path.join(workspace, "scratch.gdb")
+     if not arcpy.Exists(scratch):
+         arcpy.management.CreateFileGDB(workspace, "scratch.gdb")
+     arcpy.env.overwriteOutput = True
+     arcpy.env.extent = "MAXOF"
+     arcpy.env.workspace = workspace
+     arcpy.env.scratchWorkspace = scratch
+     ScratchSetup("MEMORY")
+     try:
+         CachedCentro(channel, dict((str(key), value) for key, value in options.items()), cache_folder, cache_size)
+     finally:
+         ScratchCleanup()
+     return os.path.join(workspace, "centerline2.shp")
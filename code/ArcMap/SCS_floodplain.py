@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_floodplain is an open-source python and arcPy code.
+          Floodplain Age Map (FAM) of Modul4_FloodplainStat. UNION engine overlays all channel polygons once
+          (bitset of years of every face, SCS_overlay) and takes the youngest year of every face, RASTER engine
+          rasterizes channel of every year to the DEM grid and reduces years by running maximum (cost linear
+          in number of years), result is converted to polygons.
+
+'''
+
+# required libraries and packages
+import os
+import numpy as np
+import arcpy
+
+from SCS_utils import ReadRings
+from SCS_scratch import Scratch
+from SCS_raster import AlignedGrid, FloodplainAge
+from SCS_overlay import BITS_FIELD, YearOverlay, UnpackYears, YearCount, FirstYear, MaxYear
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Channel years DEF
+def ChannelYears (channel_layer, field_year, workspace):
+    """
+    This function copies channel layers to CH_<year> layers with field y<year> (existing layers are not copied). \n
+    Vars:\n
+    \t channel_layer = list of channel polygon layers \n
+    \t field_year = field with year of the channel \n
+    \t workspace = output folder \n
+    RETURNS: U_layer = list of CH_<year> layers; year_list = years of the layers
+    """
+    U_layer = []
+    year_list = []
+    for fclist in channel_layer:
+        fields_search = [f.name for f in arcpy.ListFields(fclist)]
+        for field in fields_search:
+            if field == field_year:
+                field_check = field
+        with arcpy.da.SearchCursor(fclist, field_check) as cursor:
+            for row in cursor:
+                year = row [0]
+        newName = "CH_"+ str(year) + ".shp"
+        year_list.append(year)
+        newNamepath = os.path.join(workspace, newName)
+        if arcpy.Exists(newNamepath):
+            arcpy.AddMessage("{} exists, not copying".format(newNamepath))
+        else:
+            arcpy.management.CopyFeatures (fclist,newName)
+        U_layer.append(newName)
+
+    for i in range(len(U_layer)):
+        fldnames = [field.name for field in arcpy.ListFields(U_layer[i])]
+        fi = "y{}".format(year_list[i])
+        if fi not in fldnames:
+            arcpy.management.AddField(U_layer[i], "y{}".format(year_list[i]), "LONG")
+            with arcpy.da.UpdateCursor(U_layer[i], "y{}".format(year_list[i])) as cursor:
+                for row in cursor:
+                    row[0] = year_list[i]
+                    cursor.updateRow(row)
+    return U_layer, year_list
+
+# Union FAM DEF
+def UnionFAM (U_layer, year_list, fam_type="LONG"):
+    """
+    This function creates FAM by overlay of all channel layers, age of face is the youngest year of its bitset of years. \n
+    Vars:\n
+    \t U_layer = CH_<year> layers (ChannelYears) \n
+    \t year_list = years of the layers \n
+    \t fam_type = type of FAM field \n
+    RETURNS: union2 = single part polygons with FAM field (copied to fam_layer.shp with y<year> fields, YEAR_BITS, FIRST_Y and N_YEARS)
+    """
+    union, oid, bits, years = YearOverlay(U_layer, year_list, Scratch("union"))
+
+    #floodplain age (FAM), the oldest year and number of years of channel from bitsets of faces,
+    #presence fields y<year> of baseline fam_layer.shp unpacked only for the output table
+    occupied = UnpackYears(bits, len(years))
+    fields_fam = ["y{}".format(year) for year in year_list]
+    fam_fields = fields_fam + [BITS_FIELD, "FAM", "FIRST_Y", "N_YEARS"]
+    first = FirstYear(bits)
+    out = np.zeros(len(oid), dtype=[("OID_FAM", np.int32)] + [(field, np.int32) for field in fields_fam] + [("FAM", np.int16 if fam_type == "SHORT" else np.int32), ("FIRST_Y", np.int32), ("N_YEARS", np.int16)])
+    out["OID_FAM"] = oid
+    for field, year in zip(fields_fam, year_list):
+        out[field] = np.where(occupied[:, years.index(year)], int(year), 0)
+    out["FAM"] = MaxYear(bits, years)
+    out["FIRST_Y"] = np.where(first >= 0, np.asarray(years, dtype=np.int64)[np.maximum(first, 0)], 0)
+    out["N_YEARS"] = YearCount(bits)
+    arcpy.da.ExtendTable(union, arcpy.Describe(union).OIDFieldName, out, "OID_FAM", False)
+    fields_to_delete = [field.name for field in arcpy.ListFields(union) if not field.required and field.name not in fam_fields]
+    for field in fields_to_delete:
+        arcpy.DeleteField_management(union, field)
+
+    name = "fam_layer.shp"
+    union2 = arcpy.management.MultipartToSinglepart(union, Scratch("union2"))
+    arcpy.DeleteField_management(union2, "ORIG_FID")
+    arcpy.management.CopyFeatures (union2,name)
+
+    fld = ["FAM"]
+    fields_to_delete = [field.name for field in arcpy.ListFields(union2) if not field.required and field.name not in fld]
+    for field in fields_to_delete:
+        arcpy.DeleteField_management(union2, field)
+    return union2
+
+# Raster FAM DEF
+def RasterFAM (U_layer, year_list, cell_size, origin, out_raster, spatial_reference, fam_type="LONG", vectorize=True, out_layer="fam_layer.shp"):
+    """
+    This function creates FAM raster by running maximum of years of rasterized channels and optionally converts it to polygons. \n
+    Vars:\n
+    \t U_layer = CH_<year> layers (ChannelYears) \n
+    \t year_list = years of the layers \n
+    \t cell_size = cell size of FAM raster (cell size of DEM) \n
+    \t origin = lower left corner of DEM (grid of FAM snapped to DEM) \n
+    \t out_raster = output FAM raster \n
+    \t spatial_reference = spatial reference of outputs \n
+    \t fam_type = type of FAM field \n
+    \t vectorize = FAM raster converted to polygons \n
+    \t out_layer = output FAM polygon layer ("" polygons not copied) \n
+    RETURNS: union2 = single part polygons with FAM field (None without vectorize)
+    """
+    rings = [ReadRings(layer)[:2] for layer in U_layer]
+    grid = AlignedGrid(np.vstack([xy for xy, offsets in rings]), cell_size, origin)
+    xmin, ymax, size, nrows, ncols = grid
+    age = FloodplainAge(rings, year_list, grid)
+    raster = arcpy.NumPyArrayToRaster(age, arcpy.Point(xmin, ymax - nrows * size), size, size, 0)
+    arcpy.management.CopyRaster(raster, out_raster)
+    arcpy.management.DefineProjection(out_raster, spatial_reference)
+    del raster
+    if not vectorize:
+        return None
+
+    #cells of the same age to polygons, FAM from raster value
+    union2 = arcpy.conversion.RasterToPolygon(out_raster, Scratch("union2"), "NO_SIMPLIFY", "VALUE")
+    arcpy.management.AddField(union2, "FAM", fam_type)
+    with arcpy.da.UpdateCursor(union2, ["gridcode", "FAM"]) as cursor:
+        for row in cursor:
+            cursor.updateRow([row[0], row[0]])
+    fields_to_delete = [field.name for field in arcpy.ListFields(union2) if not field.required and field.name != "FAM"]
+    for field in fields_to_delete:
+        arcpy.DeleteField_management(union2, field)
+    if out_layer != "":
+        arcpy.management.CopyFeatures (union2, out_layer)
+        arcpy.management.DefineProjection(out_layer, spatial_reference)
+    return union2
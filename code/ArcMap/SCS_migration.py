@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_migration is an open-source python and arcPy code.
+          Migration distance of the centerline (Modul3_EAcalculation). Stations are placed in regular distance
+          along the older centerline, every station is moved to the nearest location of the younger
+          centerline (segment spatial index of SCS_skeleton) and signed by side of the older centerline
+          (LEFT positive, RIGHT negative). Distances and rates are aggregated also for channel segments.
+
+'''
+
+# required libraries and packages
+from __future__ import division
+import numpy as np
+import arcpy
+
+from SCS_utils import ReadRings, ArraysToGeometry, WriteGeometries, FieldTypes
+from SCS_skeleton import PointInRings, NearestOnSegments
+from SCS_segment import PathMeasure, PointsAtMeasure
+from SCS_rate import GroupSum
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Stations DEF
+def Stations (xy, offsets, spacing):
+    """
+    This function places stations in regular distance along every path (the first station in the path start). \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices \n
+    \t spacing = distance between stations \n
+    RETURNS: stations = array (n, 2) of stations; station_measure = distance of station from the path start; \n
+    \t tangent = array (n, 2) direction of the path in the station
+    """
+    #repeated vertices removed (zero length segments have no direction), paths with one vertex removed
+    repeated = np.zeros(len(xy), dtype=bool)
+    repeated[1:] = (xy[1:] == xy[:-1]).all(1)
+    repeated[offsets[:-1]] = False
+    xy = xy[~repeated]
+    offsets = offsets - np.concatenate(([0], np.cumsum(repeated)))[offsets]
+    valid = np.diff(offsets) >= 2
+    keep = np.repeat(valid, np.diff(offsets))
+    xy = xy[keep]
+    offsets = np.concatenate(([0], np.cumsum(np.diff(offsets)[valid]))).astype(np.int64)
+    measure, start, end = PathMeasure(xy, offsets)
+    count = np.floor((end - start) / spacing + 1e-9).astype(np.int64) + 1
+    path = np.repeat(np.arange(len(start)), count)
+    local = (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)) * spacing
+    values = start[path] + local
+    #segment of the station inside its path (the last segment for the station in the path end)
+    segment = np.searchsorted(measure, values, "right") - 1
+    segment = np.clip(segment, offsets[:-1][path], offsets[1:][path] - 2)
+    direction = xy[1:] - xy[:-1]
+    direction = direction / np.maximum(np.hypot(direction[:, 0], direction[:, 1]), 1e-12)[:, None]
+    tangent = direction[segment]
+    #station in the inner vertex of the path, direction of both segments of the vertex
+    vertex = (segment > offsets[:-1][path]) & (np.abs(measure[segment] - values) <= 1e-9 * np.maximum(values, 1.0))
+    tangent[vertex] += direction[segment[vertex] - 1]
+    return PointsAtMeasure(xy, measure, values), local, tangent
+
+# Station migration DEF
+def StationMigration (old_xy, old_offsets, young_xy, young_offsets, spacing):
+    """
+    This function calculates migration of the centerline in stations of the older centerline. \n
+    Side is given by direction of the older centerline in the station (cross product of tangent and migration vector). \n
+    Vars:\n
+    \t old_xy, old_offsets = paths of the older centerline \n
+    \t young_xy, young_offsets = paths of the younger centerline \n
+    \t spacing = distance between stations \n
+    RETURNS: stations = array (n, 2); station_measure = distance along older centerline; near = nearest locations \n
+    \t of younger centerline; distance = signed migration distance (LEFT positive, RIGHT negative, 0 no migration)
+    """
+    stations, station_measure, tangent = Stations(old_xy, old_offsets, spacing)
+    near, dist = NearestOnSegments(stations, young_xy, young_offsets, spacing)
+    vector = near - stations
+    side = np.sign(tangent[:, 0] * vector[:, 1] - tangent[:, 1] * vector[:, 0])
+    return stations, station_measure, near, side * dist
+
+# Segment of points DEF
+def SegmentOfPoints (pts, xy, offsets, feature):
+    """
+    This function finds polygon feature containing every point (points tested only in extent of the feature). \n
+    Vars:\n
+    \t pts = array (n, 2) of points \n
+    \t xy, offsets, feature = rings of polygon features (ReadRings) \n
+    RETURNS: segment = array of feature index of every point (-1 outside of all features)
+    """
+    segment = np.full(len(pts), -1, dtype=np.int64)
+    ring = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    for n in np.unique(feature):
+        rings = np.flatnonzero(feature == n)
+        vertices = np.concatenate([np.arange(offsets[r], offsets[r + 1]) for r in rings])
+        lo = xy[vertices].min(0)
+        hi = xy[vertices].max(0)
+        box = np.flatnonzero((segment < 0) & (pts[:, 0] >= lo[0]) & (pts[:, 0] <= hi[0]) & (pts[:, 1] >= lo[1]) & (pts[:, 1] <= hi[1]))
+        if len(box) == 0:
+            continue
+        sizes = np.diff(offsets)[rings]
+        inside = PointInRings(pts[box], xy[vertices], np.concatenate(([0], np.cumsum(sizes))).astype(np.int64))
+        segment[box[inside]] = n
+    return segment
+
+# Migration distance DEF
+def MigrationDistance (centerline_old, centerline_young, year_old, year_young, spacing, segments, spatial_reference):
+    """
+    This function creates migration vectors from stations of the older centerline with migration distance and rate of the period \n
+    and table of migration of segments. \n
+    Vars:\n
+    \t centerline_old, centerline_young = centerlines of older and younger year \n
+    \t year_old, year_young = years of the period \n
+    \t spacing = distance between stations along older centerline \n
+    \t segments = optional segment layer (Modul2_segmentation), empty string = no segment table \n
+    \t spatial_reference = spatial reference of outputs \n
+    RETURNS: station_fc = Migration_<period> vectors (station to younger centerline); table = MigSeg_<period> table of segments (None without segments)
+    """
+    y1 = year_old
+    y2 = year_young
+    span = int(str(y2)[:4]) - int(str(y1)[:4])
+    span = span if span > 0 else 1
+    old_xy, old_offsets, old_feature = ReadRings(centerline_old)
+    young_xy, young_offsets, young_feature = ReadRings(centerline_young)
+    stations, station_measure, near, distance = StationMigration(old_xy, old_offsets, young_xy, young_offsets, spacing)
+
+    #segment of every station
+    seg = np.full(len(stations), -1, dtype=np.int64)
+    seg_id = np.full(len(stations), -1, dtype=np.int64)
+    segment_fields = []
+    if segments:
+        seg_xy, seg_offsets, seg_feature = ReadRings(segments)
+        seg = SegmentOfPoints(stations, seg_xy, seg_offsets, seg_feature)
+        segment_fields = FieldTypes(segments)
+        #SEG_ID = object id (FID) of the segment as in EA_rate layers (SCS_rate), row order of ReadRings
+        segment_rows = [list(row) for row in arcpy.da.SearchCursor(segments, ["OID@"] + [name for name, field_type in segment_fields])]
+        oids = np.array([row[0] for row in segment_rows], dtype=np.int64)
+        seg_id[seg >= 0] = oids[seg[seg >= 0]]
+
+    #stations with migration vector to the younger centerline
+    vectors = [ArraysToGeometry([[stations[n], near[n]]], "POLYLINE") for n in range(len(stations))]
+    rows = [[float(station_measure[n]), float(distance[n]), "LEFT" if distance[n] > 0 else ("RIGHT" if distance[n] < 0 else ""), float(distance[n]) / span, "{}_{}".format(y1, y2), span, int(seg_id[n])] for n in range(len(stations))]
+    station_fc = WriteGeometries("Migration_{}_{}.shp".format(y1, y2), "POLYLINE", spatial_reference, vectors,
+                                 [("STATION", "DOUBLE"), ("MIG_m", "DOUBLE"), ("SIDE", "TEXT"), ("MIG_RATE", "DOUBLE"), ("period", "TEXT"), ("span_year", "SHORT"), ("SEG_ID", "LONG")], rows)
+    if not segments:
+        return station_fc, None
+
+    #mean signed and absolute migration of stations of every segment
+    valid = seg >= 0
+    groups, total, group = GroupSum([seg[valid]], distance[valid])
+    absolute = GroupSum([seg[valid]], np.abs(distance[valid]))[1]
+    count = np.bincount(group, minlength=len(groups)) if len(group) > 0 else np.zeros(0, dtype=np.int64)
+    names = [(name, "f8") if field_type in ("DOUBLE", "FLOAT") else ((name, "i4") if field_type in ("LONG", "SHORT") else (name, "U254")) for name, field_type in segment_fields if field_type != "DATE"]
+    table = np.zeros(len(groups), dtype=[("SEG_ID", "i4")] + names + [("N_STAT", "i4"), ("MIG_MEAN", "f8"), ("MIG_ABS", "f8"), ("MIG_RATE", "f8")])
+    table["SEG_ID"] = oids[groups[:, 0]] if len(groups) > 0 else []
+    for name, field_type in names:
+        index = [n for n, (field, t) in enumerate(segment_fields) if field == name][0]
+        table[name] = [segment_rows[g][index + 1] for g in (groups[:, 0] if len(groups) > 0 else [])]
+    table["N_STAT"] = count
+    table["MIG_MEAN"] = total / np.maximum(count, 1)
+    table["MIG_ABS"] = absolute / np.maximum(count, 1)
+    table["MIG_RATE"] = table["MIG_MEAN"] / span
+    out_table = "MigSeg_{}_{}.dbf".format(y1, y2)
+    if arcpy.Exists(out_table):
+        arcpy.management.Delete(out_table)
+    arcpy.da.NumPyArrayToTable(table, arcpy.env.workspace + "/" + out_table)
+    return station_fc, out_table
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_overlay is an open-source python and arcPy code.
+          Overlay of channel polygons of all years. Planar partition is built by adding one year after another
+          and every face stores the years occupied by channel as packed bitset in one text field YEAR_BITS
+          (hexadecimal, one bit per year) instead of one attribute column per year. Union of all, first and last year, count of years and maximal year are
+          evaluated from the bitsets by byte lookup tables.
+
+'''
+
+# required libraries and packages
+import binascii
+import numpy as np
+import arcpy
+
+from SCS_utils import CascadedUnion, WriteGeometries
+from SCS_scratch import Scratch
+
+#field of the bitset of years of the face
+BITS_FIELD = "YEAR_BITS"
+
+#number of set bits, first and last set bit (bit 0 = most significant bit of packbits) of every byte value
+BYTE_COUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.int64)
+BYTE_FIRST = np.array([8 - value.bit_length() if value else -1 for value in range(256)], dtype=np.int64)
+BYTE_LAST = np.array([8 - (value & -value).bit_length() if value else -1 for value in range(256)], dtype=np.int64)
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Pack years DEF
+def PackYears (occupied):
+    """
+    This function packs occupancy of years of every face to bitset. \n
+    Vars:\n
+    \t occupied = boolean array (faces, years), years ordered from older to younger \n
+    RETURNS: bits = array of uint8 (faces, ceil(years / 8))
+    """
+    return np.packbits(np.asarray(occupied, dtype=bool), axis=1)
+
+def UnpackYears (bits, count):
+    """
+    This function unpacks bitsets to occupancy of years of every face. \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    \t count = number of years \n
+    RETURNS: occupied = boolean array (faces, years)
+    """
+    return np.unpackbits(bits, axis=1)[:, :count].astype(bool)
+
+# Bitset queries DEF
+def YearCount (bits):
+    """
+    This function counts years occupied by channel in every face. \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    RETURNS: count = array of number of years
+    """
+    return BYTE_COUNT[bits].sum(axis=1)
+
+def AnyYear (bits):
+    """
+    This function selects faces occupied by channel in any year (union of all years). \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    RETURNS: mask = boolean array of faces
+    """
+    return bits.any(axis=1)
+
+def FirstYear (bits):
+    """
+    This function finds the first (oldest) year occupied by channel in every face. \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    RETURNS: index = index of the year (-1 for empty face)
+    """
+    nonzero = bits != 0
+    byte = np.argmax(nonzero, axis=1)
+    value = bits[np.arange(len(bits)), byte]
+    return np.where(nonzero.any(axis=1), byte * 8 + BYTE_FIRST[value], -1)
+
+def LastYear (bits):
+    """
+    This function finds the last (youngest) year occupied by channel in every face. \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    RETURNS: index = index of the year (-1 for empty face)
+    """
+    nonzero = bits != 0
+    byte = bits.shape[1] - 1 - np.argmax(nonzero[:, ::-1], axis=1)
+    value = bits[np.arange(len(bits)), byte]
+    return np.where(nonzero.any(axis=1), byte * 8 + BYTE_LAST[value], -1)
+
+def MaxYear (bits, years):
+    """
+    This function returns the youngest year of channel in every face (floodplain age). \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    \t years = years of the bits, ordered from older to younger \n
+    RETURNS: year = array of years (0 for empty face)
+    """
+    last = LastYear(bits)
+    return np.where(last >= 0, np.asarray(years, dtype=np.int64)[np.maximum(last, 0)], 0)
+
+# Bitset text DEF
+def BitsToText (bits):
+    """
+    This function converts bitsets to hexadecimal text of the YEAR_BITS field. \n
+    Vars:\n
+    \t bits = bitsets of faces (PackYears) \n
+    RETURNS: texts = list of texts
+    """
+    return [binascii.hexlify(row.tobytes()).decode("ascii") for row in np.ascontiguousarray(bits, dtype=np.uint8)]
+
+def TextToBits (texts, nbytes):
+    """
+    This function converts hexadecimal texts of the YEAR_BITS field to bitsets (empty text = no year). \n
+    Vars:\n
+    \t texts = texts of faces \n
+    \t nbytes = number of bytes of bitset \n
+    RETURNS: bits = array of uint8 (faces, nbytes)
+    """
+    data = "".join([str(text) if text else "00" * nbytes for text in texts])
+    return np.frombuffer(binascii.unhexlify(data.encode("ascii")), dtype=np.uint8).reshape(len(texts), nbytes).copy()
+
+# Year overlay DEF
+def YearOverlay (layers, years, out_fc):
+    """
+    This function creates planar partition of channel layers of all years with bitset of years of every face. \n
+    Years are added one by one (union of faces and the next year), faces keep only the YEAR_BITS field. \n
+    Vars:\n
+    \t layers = channel layers of the years \n
+    \t years = years of the layers \n
+    \t out_fc = output faces \n
+    RETURNS: out_fc = faces with YEAR_BITS field; oid = object id of faces; bits = bitsets of faces (PackYears); \n
+    \t years = years of the bits ordered from older to younger
+    """
+    order = sorted(range(len(layers)), key=lambda n: years[n])
+    nbytes = (len(order) + 7) // 8
+    faces = None
+    for k, n in enumerate(order):
+        if faces is None:
+            step = arcpy.management.CopyFeatures(layers[n], Scratch("overlay_{}".format(k)))
+            arcpy.management.AddField(step, BITS_FIELD, "TEXT", field_length=2 * nbytes)
+            fid = None
+        else:
+            step = arcpy.analysis.Union([faces, layers[n]], Scratch("overlay_{}".format(k)), "ALL")
+            #FID field of the added year is the second FID field (names of shapefile fields may be truncated)
+            fid = [field.name for field in arcpy.ListFields(step) if field.name.upper().startswith("FID_")][1]
+        #bit of the year set in faces inside the channel of the year
+        with arcpy.da.UpdateCursor(step, [BITS_FIELD] + ([fid] if fid else [])) as cursor:
+            for row in cursor:
+                value = bytearray(binascii.unhexlify((row[0] or "00" * nbytes).encode("ascii")))
+                if fid is None or row[1] >= 0:
+                    value[k // 8] |= 0x80 >> (k % 8)
+                row[0] = binascii.hexlify(bytes(value)).decode("ascii")
+                cursor.updateRow(row)
+        fields_to_delete = [field.name for field in arcpy.ListFields(step) if not field.required and field.name != BITS_FIELD]
+        for field in fields_to_delete:
+            arcpy.DeleteField_management(step, field)
+        if faces is not None:
+            arcpy.Delete_management(faces)
+        faces = step
+    out_fc = arcpy.management.CopyFeatures(faces, out_fc)
+    arcpy.Delete_management(faces)
+    oid = arcpy.Describe(out_fc).OIDFieldName
+    table = arcpy.da.TableToNumPyArray(out_fc, [oid, BITS_FIELD])
+    return out_fc, table[oid], TextToBits(table[BITS_FIELD], nbytes), [years[n] for n in order]
+
+# Union of all DEF
+def UnionAll (layers, out_fc, spatial_reference):
+    """
+    This function merges polygons of all layers to one feature (union of all years without planar partition). \n
+    Vars:\n
+    \t layers = polygon layers \n
+    \t out_fc = output polygon with field DISS = 1 \n
+    \t spatial_reference = spatial reference of the output \n
+    RETURNS: out_fc = output polygon
+    """
+    geometries = []
+    for layer in layers:
+        with arcpy.da.SearchCursor(layer, ["SHAPE@"]) as cursor:
+            geometries.extend([row[0] for row in cursor])
+    return WriteGeometries(out_fc, "POLYGON", spatial_reference, [CascadedUnion(geometries)], [("DISS", "SHORT")], [[1]])
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_parallel is an open-source python code.
+          Pool of worker processes for independent tasks of the moduls (one year, one period).
+          Every task runs in a new python process started from this file, so the modul script itself
+          is never imported again by the workers (script tools run also in-process in ArcGIS).
+          Task is a function of the helper module called with keyword arguments stored in JSON.
+
+'''
+
+# required libraries and packages
+import os
+import sys
+import json
+import time
+import tempfile
+import importlib
+import subprocess
+import multiprocessing
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Python executable DEF
+def PythonExecutable ():
+    """
+    This function finds python interpreter for worker processes (ArcMap and ArcGIS Pro run python embedded). \n
+    RETURNS: path = python executable
+    """
+    for name in ("python.exe", "python"):
+        path = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(path):
+            return path
+    return sys.executable
+
+# Process pool DEF
+def RunPool (module, function, jobs, workers):
+    """
+    This function runs function of the helper module for every job in separate worker processes. \n
+    Vars:\n
+    \t module = name of the helper module with task function \n
+    \t function = name of the task function \n
+    \t jobs = list of dictionaries with keyword arguments of the task (JSON serializable) \n
+    \t workers = maximal number of processes running at once \n
+    RETURNS: results = list of task results in the order of jobs
+    """
+    workers = max(1, min(int(workers), multiprocessing.cpu_count(), len(jobs)))
+    python = PythonExecutable()
+    folder = os.path.dirname(os.path.abspath(__file__))
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    running = []
+    try:
+        while len(pending) > 0 or len(running) > 0:
+            while len(pending) > 0 and len(running) < workers:
+                n = pending.pop(0)
+                handle, job_file = tempfile.mkstemp(suffix=".json")
+                with os.fdopen(handle, "w") as f:
+                    json.dump(jobs[n], f)
+                out = tempfile.TemporaryFile()
+                err = tempfile.TemporaryFile()
+                proc = subprocess.Popen([python, os.path.join(folder, "SCS_parallel.py"), module, function, job_file], cwd=folder, stdout=out, stderr=err)
+                running.append((n, proc, job_file, out, err))
+            time.sleep(0.2)
+            for task in list(running):
+                n, proc, job_file, out, err = task
+                if proc.poll() is None:
+                    continue
+                running.remove(task)
+                os.remove(job_file)
+                out.seek(0)
+                err.seek(0)
+                message = err.read().decode("utf-8", "replace")
+                lines = out.read().decode("utf-8", "replace").strip().splitlines()
+                out.close()
+                err.close()
+                if proc.returncode != 0 or len(lines) == 0:
+                    raise RuntimeError("worker {} {} failed for job {}:\n{}".format(module, function, n, message))
+                results[n] = json.loads(lines[-1])
+    finally:
+        for n, proc, job_file, out, err in running:
+            proc.kill()
+            out.close()
+            err.close()
+            if os.path.exists(job_file):
+                os.remove(job_file)
+    return results
+
+#----------------------------------------------------
+# WORKER PROCESS
+#----------------------------------------------------
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    with open(sys.argv[3]) as f:
+        job = json.load(f)
+    task = getattr(importlib.import_module(sys.argv[1]), sys.argv[2])
+    result = task(**dict((str(key), value) for key, value in job.items()))
+    sys.stdout.write("\n" + json.dumps(result) + "\n")
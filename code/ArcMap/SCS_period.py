@@ -0,0 +1,431 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_period is an open-source python and arcPy code.
+          Erosion and deposition of one period of Modul3_EAcalculation (PeriodPairs, OrientationMask, PeriodEA).
+          Stored outside of the modul so the independent periods can be calculated also in worker
+          processes (see SCS_parallel), every worker with its own scratch workspace.
+
+'''
+
+# required libraries and packages
+import os
+import arcpy
+
+import numpy as np
+
+from SCS_utils import FillHollows, ReadRings, ArraysToGeometry, WriteGeometries, DissolveFields
+from SCS_scratch import ScratchSetup, Scratch, ScratchRegister, ScratchCleanup
+from SCS_raster import PeriodState, StateClass
+from SCS_rules import EAAttributes
+from SCS_skeleton import SideOfLine, NearestOnSegments
+import SCS_skeleton
+
+#code of the period calculation is part of the key of the period in manifest of the incremental calculation
+PERIOD_FILES = ["SCS_period.py", "SCS_rules.py", "SCS_raster.py", "SCS_skeleton.py", "SCS_utils.py"]
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Period pairs DEF
+def PeriodPairs (years, mode="CONSECUTIVE", pair_list=""):
+    """
+    This function creates periods as pairs of year indices (older, younger) ordered by older and younger year. \n
+    Vars:\n
+    \t years = sorted list of years \n
+    \t mode = CONSECUTIVE (neighbouring years), ALL (every older with every younger year) or LIST \n
+    \t pair_list = periods of LIST mode separated by ";", years of period separated by "-" (e.g. 1950-2020;1990-2005) \n
+    RETURNS: pairs = list of (index of older year, index of younger year)
+    """
+    n = len(years)
+    if mode == "ALL":
+        return [(i, j) for i in range(n) for j in range(i + 1, n)]
+    if mode != "LIST":
+        return [(i, i + 1) for i in range(n - 1)]
+    names = [str(year) for year in years]
+    pairs = set()
+    for value in pair_list.replace(" ", ";").split(";"):
+        if value == "":
+            continue
+        period = [year.strip() for year in value.split("-")]
+        if len(period) != 2 or period[0] not in names or period[1] not in names or period[0] == period[1]:
+            arcpy.AddMessage("period {} is not pair of two input years, period skipped".format(value))
+            continue
+        i, j = sorted([names.index(period[0]), names.index(period[1])])
+        pairs.add((i, j))
+    return sorted(pairs)
+
+# Extend centerline DEF
+def ExtendCenterlines (centerlines, polygon, out_fcs, spatial_reference):
+    """
+    This function extends centerlines to the polygon boundary by the nearest boundary locations of the first and last point. \n
+    Endpoints of all centerlines are snapped in one query of the boundary segments. \n
+    The boundary is the union of the period, so the extension of a year differs between periods and it is done per period. \n
+    Vars:\n
+    \t centerlines = list of centerline layers \n
+    \t polygon = polygon of the period (union without hollows) \n
+    \t out_fcs = list of output centerlines \n
+    \t spatial_reference = spatial reference of outputs \n
+    RETURNS: out_fcs = centerlines extended to boundary (all parts of feature in one path)
+    """
+    boundary_xy, boundary_offsets, boundary_feature = ReadRings(polygon)
+    data = [ReadRings(centerline) for centerline in centerlines]
+    #first point of the first path and last point of the last path of every feature
+    ends = []
+    for xy, offsets, feature in data:
+        first = offsets[:-1][np.r_[True, feature[1:] != feature[:-1]]] if len(feature) > 0 else np.zeros(0, dtype=np.int64)
+        last = offsets[1:][np.r_[feature[1:] != feature[:-1], True]] - 1 if len(feature) > 0 else np.zeros(0, dtype=np.int64)
+        ends.append(np.column_stack((xy[first], xy[last])).reshape(-1, 2))
+    near, dist = NearestOnSegments(np.vstack(ends), boundary_xy, boundary_offsets)
+    k = 0
+    outputs = []
+    for (xy, offsets, feature), out_fc, end in zip(data, out_fcs, ends):
+        snapped = near[k:k + len(end)].reshape(-1, 2, 2)
+        k += len(end)
+        starts = np.flatnonzero(np.r_[True, feature[1:] != feature[:-1]]) if len(feature) > 0 else np.zeros(0, dtype=np.int64)
+        bounds = np.r_[offsets[:-1][starts], offsets[-1]]
+        lines = [ArraysToGeometry([np.vstack((snapped[n, 0], xy[bounds[n]:bounds[n + 1]], snapped[n, 1]))], "POLYLINE") for n in range(len(starts))]
+        outputs.append(WriteGeometries(out_fc, "POLYLINE", spatial_reference, lines))
+    return outputs
+
+# Side faces DEF
+def SideFaces (polygon, centerline, side_field, out_fc, distance=1.0):
+    """
+    This function cuts polygon by centerline to faces and labels faces by side of the centerline. \n
+    Side is given by cross product of the direction of the nearest centerline segment and vector to the label point of face, \n
+    faces with label point on the line are tested by centroid, faces without side stay unclassified (empty side). \n
+    Vars:\n
+    \t polygon = channel polygon envelop of the period \n
+    \t centerline = centerline extended to the polygon boundary \n
+    \t side_field = name of the side field \n
+    \t out_fc = output faces \n
+    \t distance = maximal length of centerline segments for search of the nearest segment \n
+    RETURNS: out_fc = faces with side field (LEFT, RIGHT or empty)
+    """
+    faces = arcpy.FeatureToPolygon_management([polygon, centerline], out_fc)
+    xy, offsets, feature = ReadRings(centerline)
+    shapes = [row[0] for row in arcpy.da.SearchCursor(faces, ["SHAPE@"])]
+    points = np.array([[shape.labelPoint.X, shape.labelPoint.Y] for shape in shapes]).reshape(-1, 2)
+    side = SideOfLine(points, xy, offsets, distance) if len(points) > 0 else np.zeros(0, dtype=np.int64)
+    #tie on the line, side of the centroid
+    tie = np.flatnonzero(side == 0)
+    if len(tie) > 0:
+        centroids = np.array([[shapes[n].centroid.X, shapes[n].centroid.Y] for n in tie]).reshape(-1, 2)
+        side[tie] = SideOfLine(centroids, xy, offsets, distance)
+    arcpy.management.AddField(faces, side_field, "TEXT")
+    with arcpy.da.UpdateCursor(faces, [side_field]) as cursor:
+        for n, row in enumerate(cursor):
+            row[0] = "LEFT" if side[n] > 0 else "RIGHT" if side[n] < 0 else ""
+            cursor.updateRow(row)
+    return faces
+
+# Orientation detection DEF
+def OrientationMask (polygon_old, polygon_young, centerline_old, centerline_young, year_old, year_young, spatial_reference):
+    """
+    This function calculates orientation mask for the channel layer by combination of the channel polygon and centreline. \n
+    Vars:\n
+    \t polygon_old = channel polygon envelop (without hollows) for older year \n
+    \t polygon_young = channel polygon envelop (without hollows) for younger year \n
+    \t centerline_old = centerline for older year \n
+    \t centerline_young = centerline for younger year \n
+    \t year_old = info about year for old polygon \n
+    \t year_young = info about year for young polygon \n
+    \t spatial_reference = spatial reference of the channel layers \n
+    RETURNS: SIDEMASk = channel mask polygon with information about orientation to LEFT and RIGHT side of channel
+    """
+    # input
+    chanOlder = polygon_old
+    chanYounger = polygon_young
+    cenOlder = centerline_old
+    cenYounger = centerline_young
+    y1 = year_old
+    y2 = year_young
+
+    #A combine old and young layer to mask polygon
+    uni = arcpy.analysis.Union([chanOlder, chanYounger], Scratch("uni"))
+    arcpy.management.AddField(uni, "DISS", "SHORT")
+    with arcpy.da.UpdateCursor(uni, "DISS") as cursor:
+       for row in cursor:
+         row[0] = 1
+         cursor.updateRow(row)
+    uni2 = arcpy.management.Dissolve(uni, Scratch("uni2"), "DISS")
+    
+    #A remove hollows in the layer
+    name_pol = FillHollows(uni2, "UNI_{}_{}.shp".format(y1,y2), spatial_reference)
+
+    #B extend centerlines to union boundary (endpoints of both centerlines snapped at once)
+    if SCS_skeleton.Voronoi is not None:
+        cenOlder2, cenYounger2 = ExtendCenterlines([cenOlder, cenYounger], "UNI_{}_{}.shp".format(y1,y2), [Scratch("cenOlder2"), Scratch("cenYounger2")], spatial_reference)
+    else:
+        #B check centerline to touch union boundary
+        polygon = arcpy.da.SearchCursor("UNI_{}_{}.shp".format(y1,y2), ('SHAPE@')).next()[0]
+        boundary = polygon.boundary()
+
+        #B check centerline to borders OLD polygon
+        lst_feats = []
+        cnt = 0
+        with arcpy.da.SearchCursor(cenOlder, ('SHAPE@')) as cursor:
+          for row in cursor:
+             cnt += 1
+             polyline = row[0]
+             pnt1 = polyline.firstPoint
+             pnt2 = polyline.lastPoint
+
+             pntg1_snap = boundary.snapToLine(pnt1)
+             pntg2_snap = boundary.snapToLine(pnt2)
+
+             pnt1 = pntg1_snap.firstPoint
+             pnt2 = pntg2_snap.firstPoint
+             lst_pnts = []
+             for part in polyline:
+                for pnt in part:
+                   lst_pnts.append(pnt)
+
+             lst_pnts.insert(0, pnt1)
+             lst_pnts.append(pnt2)
+
+             polyline_out = arcpy.Polyline(arcpy.Array(lst_pnts))
+             lst_feats.append(polyline_out)
+        cenOlder2 = arcpy.CopyFeatures_management(lst_feats, Scratch("cenOlder2"))
+
+        #B check centerline to borders YOUNG polygon
+        lst_feats = []
+        cnt = 0
+        with arcpy.da.SearchCursor(cenYounger, ('SHAPE@')) as cursor:
+          for row in cursor:
+             cnt += 1
+             polyline = row[0]
+             pnt1 = polyline.firstPoint
+             pnt2 = polyline.lastPoint
+
+             pntg1_snap = boundary.snapToLine(pnt1)
+             pntg2_snap = boundary.snapToLine(pnt2)
+
+             pnt1 = pntg1_snap.firstPoint
+             pnt2 = pntg2_snap.firstPoint
+             lst_pnts = []
+             for part in polyline:
+                for pnt in part:
+                   lst_pnts.append(pnt)
+
+             lst_pnts.insert(0, pnt1)
+             lst_pnts.append(pnt2)
+
+             polyline_out = arcpy.Polyline(arcpy.Array(lst_pnts))
+             lst_feats.append(polyline_out)
+        cenYounger2 = arcpy.CopyFeatures_management(lst_feats, Scratch("cenYounger2"))
+
+    #C Identification of side mask orientation (faces of union cut by centerline on LEFT or RIGHT side of centerline)
+    if SCS_skeleton.Voronoi is not None:
+        sideMaskOlder = SideFaces("UNI_{}_{}.shp".format(y1,y2), cenOlder2, "SIDE_{}".format(y1), Scratch("sideMaskOlder"))
+        sideMaskYounger = SideFaces("UNI_{}_{}.shp".format(y1,y2), cenYounger2, "SIDE_{}".format(y2), Scratch("sideMaskYounger"))
+    else:
+        #C Identification of side mask orientation by buffers OLDER (scipy not available)
+        bufLo = arcpy.analysis.Buffer(cenOlder2, Scratch("bufLo"), 1, "LEFT", "ROUND")
+        arcpy.management.AddField(bufLo, "SIDEL", "TEXT")
+        with arcpy.da.UpdateCursor(bufLo, "SIDEL") as cursor:
+          for row in cursor:
+             row[0] = "LEFT"
+             cursor.updateRow(row)
+
+        bufRo = arcpy.analysis.Buffer(cenOlder2, Scratch("bufRo"), 1, "RIGHT", "ROUND")
+        arcpy.management.AddField(bufRo, "SIDER", "TEXT")
+        with arcpy.da.UpdateCursor(bufRo, "SIDER") as cursor:
+          for row in cursor:
+             row[0] = "RIGHT"
+             cursor.updateRow(row)
+
+        bufLRo = arcpy.analysis.Union([bufLo, bufRo], Scratch("bufLRo"))
+        bufLRclipo = arcpy.analysis.Clip(bufLRo, "UNI_{}_{}.shp".format(y1,y2), Scratch("bufLRclipo"))
+        arcpy.management.AddField(bufLRclipo, "SIDE_{}".format(y1), "TEXT")
+        with arcpy.da.UpdateCursor(bufLRclipo, ("SIDE_{}".format(y1), "SIDEL", "SIDER")) as cursor:
+          for row in cursor:
+             row[0] = row[1]+row[2]
+             cursor.updateRow(row)
+
+        polcnto = arcpy.FeatureToPolygon_management(["UNI_{}_{}.shp".format(y1,y2),cenOlder2], Scratch("polcnto"))
+        fm = arcpy.FieldMappings()
+        fm.addTable(bufLRclipo)
+        fm.addTable(polcnto)
+        keepers = ["SIDE_{}".format(y1)]
+        for field in fm.fields:
+          if field.name not in keepers:
+             fm.removeFieldMap(fm.findFieldMapIndex(field.name))
+        sideMaskOlder = arcpy.analysis.SpatialJoin(polcnto, bufLRclipo, Scratch("sideMaskOlder"), "JOIN_ONE_TO_MANY", "",fm, "INTERSECT")
+
+        #C Identification of side mask orientation YOUNG
+        bufLy = arcpy.analysis.Buffer(cenYounger2, Scratch("bufLy"), 1, "LEFT", "ROUND")
+        arcpy.management.AddField(bufLy, "SIDEL", "TEXT")
+        with arcpy.da.UpdateCursor(bufLy, "SIDEL") as cursor:
+          for row in cursor:
+             row[0] = "LEFT"
+             cursor.updateRow(row)
+
+        bufRy = arcpy.analysis.Buffer(cenYounger2, Scratch("bufRy"), 1, "RIGHT", "ROUND")
+        arcpy.management.AddField(bufRy, "SIDER", "TEXT")
+        with arcpy.da.UpdateCursor(bufRy, "SIDER") as cursor:
+          for row in cursor:
+             row[0] = "RIGHT"
+             cursor.updateRow(row)
+
+        bufLRy = arcpy.analysis.Union([bufLy, bufRy], Scratch("bufLRy"))
+        bufLRclipy = arcpy.analysis.Clip(bufLRy, "UNI_{}_{}.shp".format(y1,y2), Scratch("bufLRclipy"))
+        arcpy.management.AddField(bufLRclipy, "SIDE_{}".format(y2), "TEXT")
+        with arcpy.da.UpdateCursor(bufLRclipy, ("SIDE_{}".format(y2), "SIDEL", "SIDER")) as cursor:
+          for row in cursor:
+             row[0] = row[1]+row[2]
+             cursor.updateRow(row)
+
+        polcnty = arcpy.FeatureToPolygon_management(["UNI_{}_{}.shp".format(y1,y2),cenYounger2], Scratch("polcnt"))
+        fm = arcpy.FieldMappings()
+        fm.addTable(bufLRclipy)
+        fm.addTable(polcnty)
+        keepers = ["SIDE_{}".format(y2)]
+        for field in fm.fields:
+          if field.name not in keepers:
+             fm.removeFieldMap(fm.findFieldMapIndex(field.name))
+        sideMaskYounger = arcpy.analysis.SpatialJoin(polcnty, bufLRclipy, Scratch("sideMaskYounger"), "JOIN_ONE_TO_MANY", "",fm, "INTERSECT")
+
+    #D Create SIDE MASK 
+    SIDEMASk = arcpy.analysis.Union([sideMaskOlder, sideMaskYounger], Scratch("SIDEMASk"))
+    SIDEMASk2 = arcpy.management.CopyFeatures (SIDEMASk, Scratch("SIDEMASk2"))
+
+    return SIDEMASk2
+
+# Period EA DEF
+def PeriodEA (island_old, island_young, polygon_old, polygon_young, centerline_old, centerline_young, year_old, year_young, spatial_reference, union_ea=None, migration_layer=False):
+    """
+    This function calculates erosion and deposition with side orientation for one period (two years). \n
+    Vars:\n
+    \t island_old, island_young = channel polygons with channel and island type (EA_island) for older and younger year \n
+    \t polygon_old, polygon_young = channel polygon envelop (without hollows) for older and younger year \n
+    \t centerline_old, centerline_young = centerline for older and younger year \n
+    \t year_old, year_young = years of the period \n
+    \t spatial_reference = spatial reference of the channel layers \n
+    \t union_ea = optional EA polygons of the period from raster engine (RasterEA), union of EA_island layers is not calculated \n
+    \t migration_layer = EA polygons dissolved also by migration class to EA_migration layer of the period \n
+    RETURNS: name = EA_processes layer of the period in the workspace
+    """
+    sideMask = OrientationMask (polygon_old, polygon_young, centerline_old, centerline_young, year_old, year_young, spatial_reference)
+
+    inputEA1 = island_old
+    inputEA2  = island_young
+    y1 = year_old
+    y2 = year_young
+    name = "EA_processes{}_{}.shp".format(y1,y2)
+
+    if union_ea is not None:
+        unionEA = union_ea
+    else:
+        unionEA = arcpy.analysis.Union([inputEA1,inputEA2], Scratch("unionEA"))
+
+    unionEAmask = arcpy.analysis.Union([unionEA,sideMask], Scratch("unionEAmask"))
+
+    #EA, direction, migration, period and span_year of all features in one pass (rules tables of SCS_rules)
+    oid = arcpy.Describe(unionEAmask).OIDFieldName
+    fld = ["y_{}".format(y1), "TYP_{}".format(y1), "y_{}".format(y2), "TYP_{}".format(y2), "SIDE_{}".format(y1), "SIDE_{}".format(y2)]
+    table = arcpy.da.TableToNumPyArray(unionEAmask, [oid] + fld, null_value=dict(zip(fld, [0, "", 0, "", "", ""])))
+    attributes = EAAttributes(dict(zip(["y_old", "typ_old", "y_young", "typ_young", "side_old", "side_young"], [table[field] for field in fld])), y1, y2)
+    out = np.zeros(len(table), dtype=[("OID_EA", np.int32), ("EA", "U32"), ("direction", "U32"), ("migration", "U32"), ("period", "U32"), ("span_year", np.int16)])
+    out["OID_EA"] = table[oid]
+    for field in ("EA", "direction", "migration", "period", "span_year"):
+        out[field] = attributes[field]
+    arcpy.da.ExtendTable(unionEAmask, oid, out, "OID_EA", False)
+
+    fld3 = ["y_{}".format(y1), "TYP_{}".format(y1), "y_{}".format(y2), "TYP_{}".format(y2), "EA", "direction", "period", "span_year", "migration"]
+    fields_to_delete = [field.name for field in arcpy.ListFields(unionEAmask) if not field.required and field.name not in fld3]
+    fields_to_delete.pop() 
+    for field in fields_to_delete:
+       arcpy.DeleteField_management(unionEAmask, field)
+
+    #STEP 10 final data export, EA classes and optional migration classes dissolved in one pass
+    levels = [(name, ["EA", "direction", "period", "span_year", "migration"])]
+    if migration_layer:
+        levels.append(("EA_migration{}_{}.shp".format(y1, y2), ["migration", "period", "span_year"]))
+    DissolveFields(unionEAmask, levels, spatial_reference)
+    return name
+
+# Raster EA DEF
+def RasterEA (planes_old, planes_young, grid, year_old, year_young, out_fc):
+    """
+    This function converts state of the cells of the period to EA polygons with attributes of union of EA_island layers. \n
+    Vars:\n
+    \t planes_old = channel and island bit planes of older year (SCS_raster.YearPlanes) \n
+    \t planes_young = channel and island bit planes of younger year \n
+    \t grid = aligned grid of the planes (SCS_raster.AlignedGrid) \n
+    \t year_old, year_young = years of the period \n
+    \t out_fc = output polygons \n
+    RETURNS: out_fc = polygons with fields y_<year>, TYP_<year> of both years
+    """
+    xmin, ymax, size, nrows, ncols = grid
+    y1 = year_old
+    y2 = year_young
+    state = PeriodState(planes_old, planes_young, ncols)
+    raster = arcpy.NumPyArrayToRaster(state, arcpy.Point(xmin, ymax - nrows * size), size, size, 0)
+    ScratchRegister(raster)
+    out_fc = arcpy.conversion.RasterToPolygon(raster, out_fc, "NO_SIMPLIFY", "VALUE")
+    del raster
+    fld = ["y_{}".format(y1), "TYP_{}".format(y1), "y_{}".format(y2), "TYP_{}".format(y2)]
+    for field, field_type in zip(fld, ["LONG", "TEXT", "LONG", "TEXT"]):
+        arcpy.management.AddField(out_fc, field, field_type)
+    #attributes of every state code
+    rules = {}
+    for code in range(1, 32):
+        typ_old, typ_young = StateClass(code)
+        rules[code] = [y1 if typ_old else 0, typ_old, y2 if typ_young else 0, typ_young]
+    with arcpy.da.UpdateCursor(out_fc, ["gridcode"] + fld) as cursor:
+        for row in cursor:
+            cursor.updateRow([row[0]] + rules[row[0]])
+    return out_fc
+
+# Period worker DEF
+def PeriodWorker (output_folder, workspace, period, spatial_reference, scratch_mode="MEMORY", union_ea=None, migration_layer=False):
+    """
+    This function calculates one period in worker process (outputs in output folder, temporary files in own workspace). \n
+    Vars:\n
+    \t output_folder = output folder of the modul (workspace of input and output layers) \n
+    \t workspace = folder of the worker, created if not exists, with scratch.gdb for temporary files \n
+    \t period = list of PeriodEA arguments without spatial reference \n
+    \t spatial_reference = spatial reference exported to string \n
+    \t scratch_mode = MEMORY or DISK (scratch workspace of the worker) \n
+    \t union_ea = optional EA polygons of the period from raster engine (full path) \n
+    \t migration_layer = EA_migration layer of the period also written \n
+    RETURNS: name = EA_processes layer of the period
+    """
+    if not os.path.exists(workspace):
+        os.makedirs(workspace)
+    scratch = os.path.join(workspace, "scratch.gdb")
+    if not arcpy.Exists(scratch):
+        arcpy.management.CreateFileGDB(workspace, "scratch.gdb")
+    SR = arcpy.SpatialReference()
+    SR.loadFromString(spatial_reference)
+    arcpy.env.overwriteOutput = True
+    arcpy.env.workspace = output_folder
+    arcpy.env.scratchWorkspace = scratch
+    ScratchSetup(scratch_mode)
+    try:
+        name = PeriodEA(*(list(period) + [SR, union_ea, migration_layer]))
+    finally:
+        ScratchCleanup()
+    return name
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_raster is an open-source python code.
+          Raster engine of erosion and deposition (Modul3_EAcalculation). Channel and island state of every
+          year is rasterized once to common aligned grid and stored as packed bit planes (one bit per cell).
+          Classes of the period are evaluated by bitwise logic of the planes and converted to polygons
+          only at the end. Floodplain age (Modul4_FloodplainStat) is the running maximum of years of rasterized
+          channels. Functions use numpy only (scipy for hollows of the union, no arcpy).
+
+'''
+
+# required libraries and packages
+from __future__ import division
+import numpy as np
+
+from SCS_skeleton import RingSegments
+
+try:
+    from scipy.ndimage import binary_fill_holes
+except ImportError:
+    binary_fill_holes = None
+
+#state code of the cell = channel and island bits of the older year and of the younger year, hollow bit
+OLD_CHANNEL = 1
+OLD_ISLAND = 2
+YOUNG_CHANNEL = 4
+YOUNG_ISLAND = 8
+HOLLOW = 16
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Grid DEF
+def AlignedGrid (xy, cell_size, origin=(0.0, 0.0)):
+    """
+    This function creates grid covering the vertices with origin aligned to multiples of the cell size. \n
+    Vars:\n
+    \t xy = vertices of all layers \n
+    \t cell_size = size of the cell \n
+    \t origin = corner of existing raster (e.g. DEM) the grid is snapped to \n
+    RETURNS: grid = (xmin, ymax, cell_size, number of rows, number of columns)
+    """
+    ox, oy = origin
+    xmin = np.floor((xy[:, 0].min() - ox) / cell_size) * cell_size + ox
+    ymin = np.floor((xy[:, 1].min() - oy) / cell_size) * cell_size + oy
+    xmax = np.ceil((xy[:, 0].max() - ox) / cell_size) * cell_size + ox
+    ymax = np.ceil((xy[:, 1].max() - oy) / cell_size) * cell_size + oy
+    return (float(xmin), float(ymax), float(cell_size), int(round((ymax - ymin) / cell_size)), int(round((xmax - xmin) / cell_size)))
+
+# Rasterize DEF
+def RasterizeRings (xy, offsets, grid, chunk=4000000):
+    """
+    This function rasterizes rings by even-odd rule (cell inside if its center is inside, holes excluded). \n
+    Crossings of ring segments with row centers are calculated at once and filled by parity of cumulative sum. \n
+    Vars:\n
+    \t xy = ring vertices (closed rings) \n
+    \t offsets = ring start indices and total count of vertices \n
+    \t grid = result of AlignedGrid \n
+    \t chunk = maximal number of cells filled at once \n
+    RETURNS: mask = boolean array (rows, columns)
+    """
+    xmin, ymax, size, nrows, ncols = grid
+    mask = np.zeros((nrows, ncols), dtype=bool)
+    seg = RingSegments(offsets)
+    a, b = xy[seg], xy[seg + 1]
+    lo = np.minimum(a[:, 1], b[:, 1])
+    hi = np.maximum(a[:, 1], b[:, 1])
+    #rows with center in [lo, hi) of the segment
+    r_lo = np.floor((ymax - hi) / size - 0.5).astype(np.int64) + 1
+    r_hi = np.floor((ymax - lo) / size - 0.5).astype(np.int64)
+    r_lo = np.maximum(r_lo, 0)
+    r_hi = np.minimum(r_hi, nrows - 1)
+    count = np.maximum(r_hi - r_lo + 1, 0)
+    s = np.repeat(np.arange(len(seg)), count)
+    row = np.repeat(r_lo, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    yc = ymax - (row + 0.5) * size
+    t = (yc - a[s, 1]) / (b[s, 1] - a[s, 1])
+    x = a[s, 0] + t * (b[s, 0] - a[s, 0])
+    #crossing toggles the state of all cells with center right of the crossing
+    col = np.clip(np.ceil((x - xmin) / size - 0.5), 0, ncols).astype(np.int64)
+    order = np.argsort(row, kind="mergesort")
+    row, col = row[order], col[order]
+    step = max(1, chunk // (ncols + 1))
+    for r0 in range(0, nrows, step):
+        r1 = min(r0 + step, nrows)
+        i0, i1 = np.searchsorted(row, [r0, r1])
+        toggles = np.bincount((row[i0:i1] - r0) * (ncols + 1) + col[i0:i1], minlength=(r1 - r0) * (ncols + 1))
+        parity = np.cumsum(toggles.reshape(r1 - r0, ncols + 1).astype(np.uint8), axis=1, dtype=np.uint8) & 1
+        mask[r0:r1] = parity[:, :ncols] == 1
+    return mask
+
+# Bit planes DEF
+def PackPlane (mask):
+    """
+    This function packs boolean raster to bit plane (8 cells in one byte). \n
+    Vars:\n
+    \t mask = boolean array (rows, columns) \n
+    RETURNS: plane = array of uint8 (rows, ceil(columns / 8))
+    """
+    return np.packbits(mask, axis=1)
+
+def UnpackPlane (plane, ncols):
+    """
+    This function unpacks bit plane to boolean raster. \n
+    Vars:\n
+    \t plane = result of PackPlane \n
+    \t ncols = number of columns of the raster \n
+    RETURNS: mask = boolean array (rows, columns)
+    """
+    return np.unpackbits(plane, axis=1)[:, :ncols].astype(bool)
+
+def YearPlanes (channel_xy, channel_offsets, envelope_xy, envelope_offsets, grid):
+    """
+    This function rasterizes channel and island of one year to bit planes. \n
+    Vars:\n
+    \t channel_xy, channel_offsets = rings of channel polygon (islands as holes) \n
+    \t envelope_xy, envelope_offsets = rings of channel polygon without hollows \n
+    \t grid = result of AlignedGrid \n
+    RETURNS: planes = (channel plane, island plane)
+    """
+    channel = RasterizeRings(channel_xy, channel_offsets, grid)
+    island = RasterizeRings(envelope_xy, envelope_offsets, grid) & ~channel
+    return PackPlane(channel), PackPlane(island)
+
+# Period state DEF
+def PeriodState (planes_old, planes_young, ncols):
+    """
+    This function combines bit planes of older and younger year to state code of every cell. \n
+    Hollow is area enclosed by channels of both years and outside of both of them (scipy required). \n
+    Vars:\n
+    \t planes_old = channel and island planes of older year \n
+    \t planes_young = channel and island planes of younger year \n
+    \t ncols = number of columns of the raster \n
+    RETURNS: state = array of uint8 (rows, columns), bits OLD_CHANNEL, OLD_ISLAND, YOUNG_CHANNEL, YOUNG_ISLAND, HOLLOW
+    """
+    old_channel, old_island = planes_old
+    young_channel, young_island = planes_young
+    state = UnpackPlane(old_channel, ncols).astype(np.uint8) * OLD_CHANNEL
+    state |= UnpackPlane(old_island, ncols).astype(np.uint8) * OLD_ISLAND
+    state |= UnpackPlane(young_channel, ncols).astype(np.uint8) * YOUNG_CHANNEL
+    state |= UnpackPlane(young_island, ncols).astype(np.uint8) * YOUNG_ISLAND
+    if binary_fill_holes is not None:
+        union = UnpackPlane(old_channel | old_island | young_channel | young_island, ncols)
+        state |= (binary_fill_holes(union) & ~union).astype(np.uint8) * HOLLOW
+    return state
+
+# State types DEF
+def StateClass (state):
+    """
+    This function returns type of older and younger year of the state code (EA class by SCS_rules). \n
+    Vars:\n
+    \t state = state code of the cell \n
+    RETURNS: typ_old, typ_young = channel, island or empty string
+    """
+    typ_old = "channel" if state & OLD_CHANNEL else ("island" if state & OLD_ISLAND else "")
+    typ_young = "channel" if state & YOUNG_CHANNEL else ("island" if state & YOUNG_ISLAND else "")
+    return typ_old, typ_young
+
+# Floodplain age DEF
+def FloodplainAge (rings, years, grid):
+    """
+    This function calculates floodplain age as the youngest year of channel in every cell (running maximum of years). \n
+    Vars:\n
+    \t rings = list of (xy, offsets) of channel polygon of every year \n
+    \t years = years of the channels \n
+    \t grid = result of AlignedGrid \n
+    RETURNS: age = array of int16 (int32 for years over 32767) (rows, columns), 0 = no channel
+    """
+    xmin, ymax, size, nrows, ncols = grid
+    dtype = np.int16 if max([int(year) for year in years]) <= np.iinfo(np.int16).max else np.int32
+    age = np.zeros((nrows, ncols), dtype=dtype)
+    for (xy, offsets), year in zip(rings, years):
+        if len(xy) == 0:
+            continue
+        mask = RasterizeRings(xy, offsets, grid)
+        np.maximum(age, np.where(mask, dtype(int(year)), dtype(0)), out=age)
+    return age
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@note: Standalone channel shifting toolbox (SCS Toolbox) was developed as extension of the FluvialCorridor toolbox with implemented the centerline
+       extraction approach and segmentation of DGO from FluvialCorridor toolbox.
+       For each use of the Channel toolbox leading to a publication, report, presentation or any other
+       document, please refer also to the following article :
+       Roux, C., Alber, A., Bertrand, M., Vaudor, L., Piegay, H., 2015. "FluvialCorridor": A new ArcGIS
+       package for multiscale riverscape exploration. Geomorphology, 29-37, 242.
+       doi: 10.1016/j.geomorph.2014.04.018
+
+@summary: SCS_rate is an open-source python and arcPy code.
+          Erosion and deposition of channel segments (Modul3_EAcalculation). EA polygons of all periods
+          are intersected with segments found in STR tree of segment extents (one overlay), areas are
+          aggregated by group-by of (segment, migration, period) keys and rates of all periods are
+          written also to one wide table with one row for every segment.
+
+'''
+
+# required libraries and packages
+import numpy as np
+import arcpy
+
+from SCS_utils import WriteGeometries, CascadedUnion, FieldTypes
+from SCS_segment import STRTree, STRQuery
+
+#migration classes of the rate table (field code, migration, sign of the rate)
+RATE_CLASSES = [("EL", "erosion_LEFT", 1.0), ("ER", "erosion_RIGHT", 1.0), ("DL", "deposition_LEFT", -1.0), ("DR", "deposition_RIGHT", -1.0)]
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Group-by DEF
+def GroupSum (keys, values):
+    """
+    This function sums values of rows with the same key (sorted keys, bincount of group index). \n
+    Vars:\n
+    \t keys = list of integer arrays (key columns) \n
+    \t values = array of values \n
+    RETURNS: groups = array (k, number of key columns) of unique keys; sums = array of sums; group = group index of every row
+    """
+    keys = np.column_stack([np.asarray(key, dtype=np.int64) for key in keys])
+    if len(keys) == 0:
+        return keys, np.zeros(0), np.zeros(0, dtype=np.int64)
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    new = np.ones(len(keys), dtype=bool)
+    new[1:] = (sorted_keys[1:] != sorted_keys[:-1]).any(1)
+    group = np.empty(len(keys), dtype=np.int64)
+    group[order] = np.cumsum(new) - 1
+    return sorted_keys[new], np.bincount(group, np.asarray(values, dtype=np.float64)), group
+
+# Segment overlay DEF
+def SegmentIndex (segments):
+    """
+    This function reads segment polygons and creates STR tree of their extents. \n
+    Vars:\n
+    \t segments = segment layer (Modul2_segmentation) \n
+    RETURNS: index = (list of segment geometries, list of segment attributes, segment fields, STR tree, \n
+    \t list of object id of segments = SEG_ID)
+    """
+    fields = FieldTypes(segments)
+    shapes = []
+    rows = []
+    boxes = []
+    oids = []
+    with arcpy.da.SearchCursor(segments, ["SHAPE@", "OID@"] + [name for name, field_type in fields]) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                continue
+            e = row[0].extent
+            shapes.append(row[0])
+            oids.append(row[1])
+            rows.append(list(row[2:]))
+            boxes.append([e.XMin, e.YMin, e.XMax, e.YMax])
+    return shapes, rows, fields, STRTree(boxes), oids
+
+def OverlaySegments (layer, fields, segment_index):
+    """
+    This function intersects features of the layer with segments found in STR tree (overlay without geoprocessing tool). \n
+    Vars:\n
+    \t layer = polygon layer (EA_processes) \n
+    \t fields = attribute fields of the layer copied to pieces \n
+    \t segment_index = result of SegmentIndex \n
+    RETURNS: pieces = list of geometries; rows = list of attributes of pieces; segment = array of segment index of pieces
+    """
+    shapes, segment_rows, segment_fields, tree = segment_index[:4]
+    pieces = []
+    rows = []
+    segment = []
+    with arcpy.da.SearchCursor(layer, ["SHAPE@"] + fields) as cursor:
+        for row in cursor:
+            shape = row[0]
+            if shape is None:
+                continue
+            e = shape.extent
+            for n in STRQuery(tree, [e.XMin, e.YMin, e.XMax, e.YMax]):
+                if shape.disjoint(shapes[n]):
+                    continue
+                piece = shape.intersect(shapes[n], 4)
+                if piece.area > 0:
+                    pieces.append(piece)
+                    rows.append(list(row[1:]))
+                    segment.append(n)
+    return pieces, rows, np.array(segment, dtype=np.int64)
+
+def SingleParts (geometries, spatial_reference):
+    """
+    This function splits multipart polygons to single parts. \n
+    Vars:\n
+    \t geometries = list of polygons \n
+    \t spatial_reference = spatial reference of polygons \n
+    RETURNS: parts = list of polygons; source = index of source polygon of every part
+    """
+    parts = []
+    source = []
+    for n, geometry in enumerate(geometries):
+        if geometry.partCount == 1:
+            parts.append(geometry)
+            source.append(n)
+            continue
+        for i in range(geometry.partCount):
+            parts.append(arcpy.Polygon(geometry.getPart(i), spatial_reference))
+            source.append(n)
+    return parts, source
+
+# Rate DEF
+def MigrationRate (migration, area, span_year, interval):
+    """
+    This function calculates erosion intensity and migration rate (erosion positive, deposition negative). \n
+    Vars:\n
+    \t migration = array of migration classes \n
+    \t area = array of areas \n
+    \t span_year = array of years of the period \n
+    \t interval = length of segments \n
+    RETURNS: rate_A = area per year; rate_m = area per year and segment length
+    """
+    migration = np.asarray(migration, dtype="U32")
+    sign = np.zeros(len(migration))
+    for code, name, value in RATE_CLASSES:
+        sign[migration == name] = value
+    rate_A = sign * np.asarray(area, dtype=np.float64) / np.maximum(np.asarray(span_year, dtype=np.float64), 1.0)
+    return rate_A, rate_A / interval
+
+def SegmentRates (ea_layers, periods, segments, interval, spatial_reference, update=None):
+    """
+    This function creates EAsegments and EA_rate layers of all periods and table of rates of segments. \n
+    Table has one row for every segment, period and migration class (SEG_ID = object id of the segment). \n
+    Vars:\n
+    \t ea_layers = EA_processes layers of periods \n
+    \t periods = list of (older year, younger year) of layers \n
+    \t segments = segment layer (Modul2_segmentation) \n
+    \t interval = length of segments \n
+    \t spatial_reference = spatial reference of outputs \n
+    \t update = optional list of periods calculated again (other periods are read from existing EA_rate layer) \n
+    RETURNS: rate_layers = list of EA_rate layers; table = EA_rate_segments table
+    """
+    segment_index = SegmentIndex(segments)
+    segment_rows, segment_fields, oids = segment_index[1], segment_index[2], np.array(segment_index[4], dtype=np.int64)
+    ea_fields = ["EA", "direction", "period", "span_year", "migration"]
+    ea_types = [("EA", "TEXT"), ("direction", "TEXT"), ("period", "TEXT"), ("span_year", "SHORT"), ("migration", "TEXT")]
+    rate_layers = []
+    long_rows = []
+    for p, layer in enumerate(ea_layers):
+        y1, y2 = periods[p]
+        EArate = "EA_rate_{}_{}.shp".format(y1, y2)
+        if update is not None and not update[p] and arcpy.Exists(EArate) and "SEG_ID" in [field.name for field in arcpy.ListFields(EArate)]:
+            #rates of unchanged period
+            rates = arcpy.da.TableToNumPyArray(EArate, ["SEG_ID", "migration", "EA_rate_A", "EA_rate_m"])
+            rate_layers.append(EArate)
+            long_rows.append(("{}_{}".format(y1, y2), rates["SEG_ID"], rates["migration"].astype("U32"), rates["EA_rate_A"], rates["EA_rate_m"]))
+            continue
+        pieces, rows, segment = OverlaySegments(layer, ea_fields, segment_index)
+
+        #EAsegments = single parts of EA polygons in segments
+        parts, source = SingleParts(pieces, spatial_reference)
+        name = "EAsegments_{}_{}.shp".format(y1, y2)
+        WriteGeometries(name, "POLYGON", spatial_reference, parts, ea_types + segment_fields, [rows[n] + segment_rows[segment[n]] for n in source])
+
+        #EA_rate = pieces of the same segment and migration class merged, rates from sum of areas
+        migration = np.array([row[4] for row in rows], dtype="U32")
+        classes, migration_id = np.unique(migration, return_inverse=True) if len(rows) > 0 else (np.zeros(0, dtype="U32"), np.zeros(0, dtype=np.int64))
+        groups, area, group = GroupSum([segment, migration_id], [piece.area for piece in pieces])
+        span = np.array([row[3] for row in rows])
+        span_group = np.zeros(len(groups))
+        span_group[group] = span
+        rate_A, rate_m = MigrationRate(classes[groups[:, 1]], area, span_group, interval)
+        order = np.argsort(group, kind="mergesort")
+        members = np.split(order, np.cumsum(np.bincount(group, minlength=len(groups)))[:-1]) if len(groups) > 0 else []
+        geometries = [CascadedUnion([pieces[n] for n in m]) for m in members]
+        rate_rows = [[int(span_group[g]), classes[groups[g, 1]], "{}_{}".format(y1, y2), int(oids[groups[g, 0]])] + segment_rows[groups[g, 0]] + [rate_A[g], rate_m[g]] for g in range(len(groups))]
+        WriteGeometries(EArate, "POLYGON", spatial_reference, geometries, [("span_year", "SHORT"), ("migration", "TEXT"), ("period", "TEXT"), ("SEG_ID", "LONG")] + segment_fields + [("EA_rate_A", "DOUBLE"), ("EA_rate_m", "DOUBLE")], rate_rows)
+        rate_layers.append(EArate)
+        long_rows.append(("{}_{}".format(y1, y2), oids[groups[:, 0]], classes[groups[:, 1]], rate_A, rate_m))
+
+    #long table, row for segment, period and migration class (number of fields independent of number of periods)
+    codes = dict((name, code) for code, name, sign in RATE_CLASSES)
+    count = sum([len(item[1]) for item in long_rows])
+    table = np.zeros(count, dtype=[("SEG_ID", "i4"), ("PERIOD", "U32"), ("CODE", "U8"), ("RATE_A", "f8"), ("RATE_M", "f8")])
+    start = 0
+    for period, segment, migration, rate_A, rate_m in long_rows:
+        end = start + len(segment)
+        table["SEG_ID"][start:end] = segment
+        table["PERIOD"][start:end] = period
+        table["CODE"][start:end] = [codes.get(name, "") for name in migration]
+        table["RATE_A"][start:end] = rate_A
+        table["RATE_M"][start:end] = rate_m
+        start = end
+    table = table[table["CODE"] != ""]
+    out_table = "EA_rate_segments.dbf"
+    if arcpy.Exists(out_table):
+        arcpy.management.Delete(out_table)
+    arcpy.da.NumPyArrayToTable(table, arcpy.env.workspace + "/" + out_table)
+    return rate_layers, out_table
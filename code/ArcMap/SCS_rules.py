@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_rules is an open-source python code.
+          Classification rules of erosion and deposition (Modul3_EAcalculation) in declarative tables.
+          Rules are evaluated on attribute columns (numpy arrays) of all features at once, the first
+          matching rule gives the value. Tables are shared by the polygon and raster EA engines.
+          Functions use numpy only (no arcpy).
+
+'''
+
+# required libraries and packages
+import numpy as np
+
+#===============================================================================
+# RULES
+#===============================================================================
+#columns: old, young = feature inside channel polygon of older / younger year; typ_old, typ_young = channel or island;
+#side_old, side_young = LEFT or RIGHT side of older / younger centerline; EA, direction = classified columns
+
+#class of erosion and deposition (EA)
+EA_RULES = [
+    ("erosion", lambda c: ~c["old"] & (c["typ_young"] == "channel")),
+    ("deposition", lambda c: ~c["young"] & (c["typ_old"] == "channel")),
+    ("hollow", lambda c: ~c["old"] & ~c["young"]),
+    ("island_erosion", lambda c: (c["typ_old"] == "island") & (c["typ_young"] == "channel")),
+    ("island_deposition", lambda c: (c["typ_old"] == "channel") & (c["typ_young"] == "island")),
+    ("stable", lambda c: (c["typ_old"] == c["typ_young"]) | (~c["old"] & (c["typ_young"] == "island")) | (~c["young"] & (c["typ_old"] == "island"))),
+    ]
+
+#side of erosion (older centerline) and deposition (younger centerline)
+DIRECTION_RULES = [
+    (lambda c: c["side_young"], lambda c: c["EA"] == "deposition"),
+    (lambda c: c["side_old"], lambda c: (c["EA"] == "erosion") | (c["EA"] == "hollow")),
+    ("in-channel process", lambda c: np.ones(len(c["EA"]), dtype=bool)),
+    ]
+
+#migration = class and side of erosion and deposition
+MIGRATION_RULES = [
+    ("in-channel process", lambda c: c["direction"] == "in-channel process"),
+    (lambda c: np.char.add("erosion_", c["direction"]), lambda c: (c["EA"] == "erosion") | (c["EA"] == "hollow")),
+    (lambda c: np.char.add("deposition_", c["direction"]), lambda c: c["EA"] == "deposition"),
+    ]
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Rules DEF
+def ApplyRules (columns, rules, default=""):
+    """
+    This function evaluates rules table on attribute columns (value of the first matching rule). \n
+    Vars:\n
+    \t columns = dictionary of attribute arrays \n
+    \t rules = list of (value, condition), value is constant or function of columns, condition is function of columns \n
+    \t default = value of features without matching rule \n
+    RETURNS: values = array of values
+    """
+    n = len(next(iter(columns.values())))
+    values = np.empty(n, dtype="U32")
+    values[:] = default
+    done = np.zeros(n, dtype=bool)
+    for value, condition in rules:
+        match = np.asarray(condition(columns), dtype=bool) & ~done
+        if callable(value):
+            values[match] = np.asarray(value(columns), dtype="U32")[match]
+        else:
+            values[match] = value
+        done |= match
+    return values
+
+# EA attributes DEF
+def EAAttributes (columns, year_old, year_young):
+    """
+    This function classifies erosion and deposition, its side and migration of all features of the period. \n
+    Vars:\n
+    \t columns = dictionary of arrays y_old, typ_old, y_young, typ_young (year and type fields of EA_island layers) \n
+    \t           and side_old, side_young (side mask) \n
+    \t year_old, year_young = years of the period \n
+    RETURNS: attributes = dictionary of arrays EA, direction, migration, period and span_year
+    """
+    c = dict(columns)
+    c["old"] = np.asarray(c["y_old"]) == year_old
+    c["young"] = np.asarray(c["y_young"]) == year_young
+    for key in ("typ_old", "typ_young", "side_old", "side_young"):
+        c[key] = np.asarray(c[key], dtype="U32")
+    c["EA"] = ApplyRules(c, EA_RULES)
+    c["direction"] = ApplyRules(c, DIRECTION_RULES)
+    c["migration"] = ApplyRules(c, MIGRATION_RULES)
+    n = len(c["EA"])
+    span = int(str(year_young)[:4]) - int(str(year_old)[:4])
+    return {"EA": c["EA"], "direction": c["direction"], "migration": c["migration"],
+            "period": np.array(["{}_{}".format(year_old, year_young)] * n, dtype="U32"),
+            "span_year": np.full(n, span if span > 0 else 1, dtype=np.int16)}
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_scratch is an open-source python and arcPy code.
+          Scratch workspace of the moduls. Temporary datasets are created in memory (MEMORY mode)
+          or in the scratch workspace on disk (DISK mode, used also when input data are larger than
+          the size limit). Every temporary dataset is registered and all of them are deleted
+          by one call at the end of the modul, also when the modul fails.
+
+'''
+
+# required libraries and packages
+import os
+import arcpy
+
+MEMORY_WORKSPACE = "in_memory"
+
+#scratch mode of the running modul and registered temporary datasets
+SCRATCH = {"mode": "DISK", "datasets": []}
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Dataset size DEF
+def DatasetSize (layers):
+    """
+    This function estimates size of the input layers in MB (files of shapefiles, vertices of other feature classes). \n
+    Vars:\n
+    \t layers = list of layers \n
+    RETURNS: size = size in MB
+    """
+    size = 0
+    for layer in layers:
+        path = arcpy.Describe(layer).catalogPath
+        if path.lower().endswith(".shp"):
+            for ext in (".shp", ".shx", ".dbf"):
+                part = os.path.splitext(path)[0] + ext
+                if os.path.exists(part):
+                    size += os.path.getsize(part)
+        else:
+            size += 16 * sum(row[0].pointCount for row in arcpy.da.SearchCursor(layer, ["SHAPE@"]) if row[0] is not None)
+    return size / (1024.0 * 1024.0)
+
+# Scratch setup DEF
+def ScratchSetup (mode="MEMORY", max_size=512.0, inputs=None):
+    """
+    This function sets scratch mode of the modul. MEMORY mode spills to disk when input layers are larger than max_size. \n
+    Vars:\n
+    \t mode = MEMORY or DISK \n
+    \t max_size = maximal size of input layers in MB for MEMORY mode \n
+    \t inputs = list of input layers \n
+    RETURNS: mode = used scratch mode
+    """
+    mode = mode.upper()
+    if mode == "MEMORY" and inputs:
+        size = DatasetSize(inputs)
+        if size > max_size:
+            arcpy.AddMessage("Input data {:.1f} MB larger than {:.1f} MB, temporary files stored in scratch workspace".format(size, max_size))
+            mode = "DISK"
+    SCRATCH["mode"] = mode
+    SCRATCH["datasets"] = []
+    return mode
+
+# Scratch dataset DEF
+def Scratch (name, memory=True):
+    """
+    This function returns path of the temporary dataset and registers it for deleting. \n
+    Vars:\n
+    \t name = name of the temporary dataset \n
+    \t memory = False for datasets which have to stay in scratch workspace (e.g. used by FID of shapefile) \n
+    RETURNS: path = dataset in memory or in scratch workspace
+    """
+    if SCRATCH["mode"] == "MEMORY" and memory:
+        path = MEMORY_WORKSPACE + "\\" + name
+    else:
+        path = "%ScratchWorkspace%\\" + name
+    if path not in SCRATCH["datasets"]:
+        SCRATCH["datasets"].append(path)
+    return path
+
+# Scratch register DEF
+def ScratchRegister (dataset):
+    """
+    This function registers other temporary dataset (raster, layer, file in workspace) for deleting. \n
+    Vars:\n
+    \t dataset = dataset, layer or result of the tool \n
+    RETURNS: dataset
+    """
+    SCRATCH["datasets"].append(str(dataset))
+    return dataset
+
+# Scratch cleanup DEF
+def ScratchCleanup ():
+    """
+    This function deletes all registered temporary datasets (call in finally block of the modul).
+    """
+    scratch = arcpy.env.scratchWorkspace or arcpy.env.scratchGDB
+    for path in reversed(SCRATCH["datasets"]):
+        if path.startswith("%ScratchWorkspace%"):
+            path = path.replace("%ScratchWorkspace%", scratch)
+            candidates = [path, path + ".shp"]
+        else:
+            candidates = [path]
+        for candidate in candidates:
+            try:
+                if arcpy.Exists(candidate):
+                    arcpy.management.Delete(candidate)
+            except Exception:
+                #cleanup must not hide the error of the modul
+                continue
+    SCRATCH["datasets"] = []
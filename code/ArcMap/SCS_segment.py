@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_segment is an open-source python code.
+          In-memory segmentation of the centerline for Modul2_segmentation. Centerline is handled as one
+          coordinate array of path vertices (xy) with path start indices (offsets) and cut by linear
+          referencing (cumulative length along the paths). Segments are Voronoi cells of the piece
+          midpoints bounded by the channel envelope, clipped only by channel pieces found in STR tree.
+          Functions use numpy and scipy only (no arcpy).
+
+'''
+
+# required libraries and packages
+from __future__ import division
+import heapq
+import numpy as np
+
+from SCS_skeleton import DensifyRings, PointInRings, UniqueRows
+
+try:
+    from scipy.spatial import Voronoi
+except ImportError:
+    Voronoi = None
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Measure DEF
+def PathMeasure (xy, offsets, gap=1.0):
+    """
+    This function calculates measure (cumulative length) of every vertex. Measures of all paths are \n
+    in one increasing sequence, next path starts gap after the end of the previous path. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t gap = distance between measures of paths \n
+    RETURNS: measure = array of vertex measures; start, end = measure of the start and end of every path
+    """
+    d = np.hypot(np.diff(xy[:, 0]), np.diff(xy[:, 1]))
+    #no length between the last vertex of path and the first vertex of the next path
+    d[offsets[1:-1] - 1] = 0.0
+    local = np.concatenate(([0.0], np.cumsum(d)))
+    length = local[offsets[1:] - 1] - local[offsets[:-1]]
+    start = np.concatenate(([0.0], np.cumsum(length + gap)[:-1]))
+    path = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    measure = local - local[offsets[:-1]][path] + start[path]
+    return measure, start, start + length
+
+def PointsAtMeasure (xy, measure, values):
+    """
+    This function interpolates points at measures. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t measure = vertex measures (increasing) \n
+    \t values = measures of the points \n
+    RETURNS: points = array (n, 2)
+    """
+    return np.column_stack((np.interp(values, measure, xy[:, 0]), np.interp(values, measure, xy[:, 1])))
+
+# Split paths DEF
+def PieceMeasures (xy, offsets, interval):
+    """
+    This function calculates measures of pieces of paths cut at exact multiples of interval from the start of every path. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t interval = length of pieces \n
+    RETURNS: xy, measure = vertices without repeated vertices and their measures; lo, hi = measure of start and end of pieces
+    """
+    #repeated vertices removed (zero length segments)
+    repeated = np.zeros(len(xy), dtype=bool)
+    repeated[1:] = (xy[1:] == xy[:-1]).all(1)
+    repeated[offsets[:-1]] = False
+    xy = xy[~repeated]
+    offsets = offsets - np.concatenate(([0], np.cumsum(repeated)))[offsets]
+    measure, start, end = PathMeasure(xy, offsets)
+    length = end - start
+    #cuts inside every path (tiny rest at the end of path is not a new piece)
+    count = np.maximum(np.ceil(length / interval - 1e-9), 1).astype(np.int64)
+    path = np.repeat(np.arange(len(start)), count)
+    k = np.arange(len(path)) - np.repeat(np.cumsum(count) - count, count)
+    lo = start[path] + k * interval
+    hi = np.minimum(lo + interval, end[path])
+    return xy, measure, lo, hi
+
+def SplitMidpoints (xy, offsets, interval):
+    """
+    This function calculates midpoints of pieces of paths cut at exact multiples of interval (pieces are not created). \n
+    Pieces are numbered in reversed order (the last piece has ID 1) as the sequence ID of the segments. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t interval = length of pieces \n
+    RETURNS: midpoints = array (k, 2) of piece midpoints; ids = reversed sequence ID of pieces
+    """
+    xy, measure, lo, hi = PieceMeasures(xy, offsets, interval)
+    return PointsAtMeasure(xy, measure, 0.5 * (lo + hi)), len(lo) - np.arange(len(lo))
+
+# Bounded Voronoi DEF
+def BoundedVoronoi (points, bbox):
+    """
+    This function calculates Voronoi cells of points bounded by rectangle (points mirrored by the rectangle sides). \n
+    Vars:\n
+    \t points = array (n, 2) of points inside the rectangle \n
+    \t bbox = rectangle [xmin, ymin, xmax, ymax] \n
+    RETURNS: cells = list of closed clockwise rings (k, 2), one for every point
+    """
+    xmin, ymin, xmax, ymax = bbox
+    first, inverse = UniqueRows(points)
+    unique = points[first]
+    x, y = unique[:, 0], unique[:, 1]
+    mirrored = np.vstack((unique,
+                          np.column_stack((2 * xmin - x, y)), np.column_stack((2 * xmax - x, y)),
+                          np.column_stack((x, 2 * ymin - y)), np.column_stack((x, 2 * ymax - y))))
+    vor = Voronoi(mirrored)
+    cells = []
+    for i in range(len(unique)):
+        ring = vor.vertices[vor.regions[vor.point_region[i]]]
+        #convex cell ordered clockwise around the point
+        angle = np.arctan2(ring[:, 1] - y[i], ring[:, 0] - x[i])
+        ring = ring[np.argsort(-angle)]
+        cells.append(np.vstack((ring, ring[:1])))
+    return [cells[n] for n in inverse]
+
+# STR tree DEF
+def STRTree (boxes, node_size=16):
+    """
+    This function packs bounding boxes to nodes by Sort-Tile-Recursive method (two level tree). \n
+    Vars:\n
+    \t boxes = array (n, 4) of boxes [xmin, ymin, xmax, ymax] \n
+    \t node_size = number of boxes in node \n
+    RETURNS: tree = (boxes, order of boxes, start of nodes in order, node boxes)
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    n = len(boxes)
+    if n == 0:
+        return boxes, np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros((0, 4))
+    cx = 0.5 * (boxes[:, 0] + boxes[:, 2])
+    cy = 0.5 * (boxes[:, 1] + boxes[:, 3])
+    slices = int(np.ceil(np.sqrt(np.ceil(n / node_size))))
+    order = np.argsort(cx, kind="mergesort")
+    slice_id = np.arange(n) // (slices * node_size)
+    order = order[np.lexsort((cy[order], slice_id))]
+    #nodes do not cross slices
+    rank = np.arange(n) - np.searchsorted(slice_id, slice_id)
+    new_node = (rank % node_size) == 0
+    start = np.flatnonzero(new_node)
+    node_boxes = np.column_stack((np.minimum.reduceat(boxes[order, 0], start), np.minimum.reduceat(boxes[order, 1], start),
+                                  np.maximum.reduceat(boxes[order, 2], start), np.maximum.reduceat(boxes[order, 3], start)))
+    return boxes, order, np.concatenate((start, [n])).astype(np.int64), node_boxes
+
+def STRQuery (tree, box):
+    """
+    This function finds boxes of the tree intersecting the box. \n
+    Vars:\n
+    \t tree = result of STRTree \n
+    \t box = [xmin, ymin, xmax, ymax] \n
+    RETURNS: index = array of indices of intersecting boxes
+    """
+    boxes, order, start, node_boxes = tree
+    hit = np.flatnonzero((node_boxes[:, 0] <= box[2]) & (node_boxes[:, 2] >= box[0]) & (node_boxes[:, 1] <= box[3]) & (node_boxes[:, 3] >= box[1]))
+    if len(hit) == 0:
+        return np.zeros(0, dtype=np.int64)
+    count = start[hit + 1] - start[hit]
+    items = order[np.repeat(start[hit], count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)]
+    b = boxes[items]
+    return np.sort(items[(b[:, 0] <= box[2]) & (b[:, 2] >= box[0]) & (b[:, 1] <= box[3]) & (b[:, 3] >= box[1])])
+
+# Channel tiles DEF
+def ChannelTiles (xy, offsets, size, max_tiles=250000):
+    """
+    This function finds square tiles of regular grid covering the channel (tiles with bank or inside the channel). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t size = size of tile \n
+    \t max_tiles = maximal number of tiles of the grid (size is increased for large extent) \n
+    RETURNS: tiles = array (n, 4) of tiles [xmin, ymin, xmax, ymax]
+    """
+    lo = xy.min(0)
+    span = xy.max(0) - lo
+    size = max(size, np.sqrt(span[0] * span[1] / max_tiles))
+    nx, ny = (np.floor(span / size) + 1).astype(np.int64)
+    dense, dense_offsets = DensifyRings(xy, offsets, 0.5 * size)
+    cell = np.floor((dense - lo) / size).astype(np.int64)
+    occupied = np.zeros(nx * ny, dtype=bool)
+    occupied[np.minimum(cell[:, 0], nx - 1) * ny + np.minimum(cell[:, 1], ny - 1)] = True
+    ix = np.arange(nx * ny) // ny
+    iy = np.arange(nx * ny) % ny
+    centers = lo + (np.column_stack((ix, iy)) + 0.5) * size
+    occupied |= PointInRings(centers, xy, offsets)
+    ix, iy = ix[occupied], iy[occupied]
+    return np.column_stack((lo[0] + ix * size, lo[1] + iy * size, lo[0] + (ix + 1) * size, lo[1] + (iy + 1) * size))
+
+# Douglas-Peucker DEF
+def DouglasPeuckerRank (xy, offsets):
+    """
+    This function calculates Douglas-Peucker tolerance of every vertex (all paths split together in every step). \n
+    Vertex is kept for every tolerance smaller than its rank (rank of vertex is not larger than rank of its parent split). \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    RETURNS: rank = array of vertex tolerances (infinity for the first and the last vertex of path)
+    """
+    rank = np.zeros(len(xy))
+    rank[offsets[:-1]] = np.inf
+    rank[offsets[1:] - 1] = np.inf
+    a = offsets[:-1]
+    b = offsets[1:] - 1
+    cap = np.full(len(a), np.inf)
+    active = b - a > 1
+    a, b, cap = a[active], b[active], cap[active]
+    while len(a) > 0:
+        size = b - a - 1
+        first = np.cumsum(size) - size
+        part = np.repeat(np.arange(len(a)), size)
+        idx = np.repeat(a, size) + np.arange(size.sum()) - np.repeat(first, size) + 1
+        #distance of inner vertices to the segment between range ends
+        s = xy[a][part]
+        d = xy[b][part] - s
+        v = xy[idx] - s
+        dd = (d * d).sum(1)
+        t = np.clip((v * d).sum(1) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+        dist = np.hypot(v[:, 0] - t * d[:, 0], v[:, 1] - t * d[:, 1])
+        #the farthest vertex of every range (the first one for equal distance)
+        order = np.lexsort((-dist, part))
+        far = order[first]
+        m = idx[far]
+        rank[m] = np.minimum(dist[far], cap)
+        a, b, cap = np.concatenate((a, m)), np.concatenate((m, b)), np.concatenate((rank[m], rank[m]))
+        active = b - a > 1
+        a, b, cap = a[active], b[active], cap[active]
+    return rank
+
+# Visvalingam-Whyatt DEF
+def VisvalingamRank (xy, offsets):
+    """
+    This function calculates effective area of every vertex by Visvalingam-Whyatt elimination. Vertex with the smallest \n
+    triangle area (vertex and its kept neighbours) is removed one at a time and areas of its neighbours are updated \n
+    (priority queue). Effective area is not smaller than area of previously removed vertex, so vertices kept for area \n
+    threshold are vertices with effective area not smaller than the threshold. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    RETURNS: rank = array of effective areas (infinity for path ends)
+    """
+    n = len(xy)
+    rank = np.full(n, np.inf)
+    end = np.zeros(n, dtype=bool)
+    end[offsets[:-1][np.diff(offsets) > 0]] = True
+    end[offsets[1:][np.diff(offsets) > 0] - 1] = True
+    inner = np.flatnonzero(~end)
+    if len(inner) == 0:
+        return rank
+    a, b, c = xy[inner - 1], xy[inner], xy[inner + 1]
+    tri = 0.5 * np.abs((b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (c[:, 0] - a[:, 0]) * (b[:, 1] - a[:, 1]))
+    x = xy[:, 0].tolist()
+    y = xy[:, 1].tolist()
+    prev = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    current = [0.0] * n
+    for i, value in zip(inner.tolist(), tri.tolist()):
+        current[i] = value
+    heap = list(zip(tri.tolist(), inner.tolist()))
+    heapq.heapify(heap)
+    removed = [False] * n
+    is_end = end.tolist()
+    last = 0.0
+    while heap:
+        value, i = heapq.heappop(heap)
+        if removed[i] or value != current[i]:
+            continue
+        last = max(last, value)
+        rank[i] = last
+        removed[i] = True
+        p, q = prev[i], following[i]
+        following[p] = q
+        prev[q] = p
+        #new triangles of the neighbours
+        for j in (p, q):
+            if is_end[j]:
+                continue
+            u, w = prev[j], following[j]
+            current[j] = 0.5 * abs((x[j] - x[u]) * (y[w] - y[u]) - (x[w] - x[u]) * (y[j] - y[u]))
+            heapq.heappush(heap, (current[j], j))
+    return rank
+
+def VisvalingamWhyatt (xy, offsets, area):
+    """
+    This function removes vertices by Visvalingam-Whyatt algorithm until the smallest triangle area is not smaller than area. \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t area = minimal triangle area of kept vertex \n
+    RETURNS: keep = boolean array of kept vertices
+    """
+    return VisvalingamRank(xy, offsets) >= area
+
+# Simplification DEF
+def SimplifyPaths (xy, offsets, tolerance, method="DOUGLAS_PEUCKER"):
+    """
+    This function simplifies paths by Douglas-Peucker (distance tolerance) or Visvalingam-Whyatt (area tolerance^2). \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t tolerance = simplification tolerance in map units \n
+    \t method = DOUGLAS_PEUCKER or VISVALINGAM \n
+    RETURNS: xy, offsets = vertices and start indices of simplified paths
+    """
+    if method.upper() == "VISVALINGAM":
+        keep = VisvalingamWhyatt(xy, offsets, tolerance * tolerance)
+    else:
+        keep = DouglasPeuckerRank(xy, offsets) > tolerance
+    count = np.concatenate(([0], np.cumsum(keep)))
+    return xy[keep], count[offsets].astype(np.int64)
+
+def SimplificationSweep (xy, offsets, tolerances, method="DOUGLAS_PEUCKER"):
+    """
+    This function counts vertices of simplified paths for every tolerance (ranks of vertices calculated once). \n
+    Vars:\n
+    \t xy = path vertices \n
+    \t offsets = path start indices and total count of vertices \n
+    \t tolerances = list of tolerances \n
+    \t method = DOUGLAS_PEUCKER or VISVALINGAM \n
+    RETURNS: counts = array of vertex counts for every tolerance
+    """
+    if method.upper() == "VISVALINGAM":
+        #areas of Visvalingam-Whyatt, vertex kept for effective area >= tolerance^2
+        rank = np.sort(VisvalingamRank(xy, offsets))
+        return len(rank) - np.searchsorted(rank, np.asarray(tolerances, dtype=np.float64) ** 2, "left")
+    rank = np.sort(DouglasPeuckerRank(xy, offsets))
+    return len(rank) - np.searchsorted(rank, np.asarray(tolerances, dtype=np.float64), "right")
@@ -0,0 +1,961 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_skeleton is an open-source python code.
+          In-memory centerline extraction for Modul1_Centerline. The channel polygon is handled as one
+          coordinate array of ring vertices (xy) with ring start indices (offsets), the Voronoi diagram
+          of the densified vertices is built once and only its interior edges are kept.
+          Very long reaches are calculated in overlapping tiles along the long axis and stitched together.
+          Functions use numpy and scipy only (no arcpy).
+
+'''
+
+# required libraries and packages
+from __future__ import division
+import os
+import numpy as np
+
+try:
+    from scipy.spatial import Voronoi, cKDTree
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components, dijkstra
+except ImportError:
+    Voronoi = None
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Ring structure DEF
+def RingSegments (offsets):
+    """
+    This function returns start vertex of every ring segment (segment i connects vertex i and i+1). \n
+    Vars:\n
+    \t offsets = ring start indices and total count of vertices \n
+    RETURNS: seg = array of segment start vertices
+    """
+    mask = np.ones(offsets[-1], dtype=bool)
+    counts = np.diff(offsets)
+    mask[offsets[1:][counts > 0] - 1] = False
+    return np.nonzero(mask)[0]
+
+def RingIndex (offsets):
+    """
+    This function returns ring index for every vertex. \n
+    Vars:\n
+    \t offsets = ring start indices and total count of vertices \n
+    RETURNS: ring = array of ring index
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+def RingsLength (xy, offsets):
+    """
+    This function calculates total length of all rings (perimeter). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    RETURNS: length = float
+    """
+    seg = RingSegments(offsets)
+    d = xy[seg + 1] - xy[seg]
+    return float(np.hypot(d[:, 0], d[:, 1]).sum())
+
+# Densify DEF
+def DensifyRings (xy, offsets, distance):
+    """
+    This function densifies rings with regular distribution of vertices (maximal segment length). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t distance = maximal distance between vertices \n
+    RETURNS: xy, offsets of densified rings (original vertices are preserved)
+    """
+    if distance <= 0 or len(xy) == 0:
+        return xy, offsets
+    seg = RingSegments(offsets)
+    d = xy[seg + 1] - xy[seg]
+    length = np.hypot(d[:, 0], d[:, 1])
+    count = np.ones(len(xy), dtype=np.int64)
+    count[seg] = np.maximum(np.ceil(length / distance), 1).astype(np.int64)
+    step = np.zeros(xy.shape)
+    step[seg] = d / count[seg][:, None]
+    idx = np.repeat(np.arange(len(xy)), count)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(count) - count, count)
+    new_xy = xy[idx] + step[idx] * k[:, None]
+    ends = np.cumsum(count)
+    new_offsets = np.concatenate(([0], ends[offsets[1:] - 1])).astype(np.int64)
+    return new_xy, new_offsets
+
+def RingsArea (xy, offsets):
+    """
+    This function calculates signed area of every ring (negative for clockwise exterior rings). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    RETURNS: area = array of ring areas
+    """
+    seg = RingSegments(offsets)
+    cross = xy[seg, 0] * xy[seg + 1, 1] - xy[seg + 1, 0] * xy[seg, 1]
+    return 0.5 * np.bincount(RingIndex(offsets)[seg], cross, minlength=len(offsets) - 1)
+
+def ChannelWidth (xy, offsets):
+    """
+    This function estimates mean channel width from area and perimeter (2 * area / perimeter). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    RETURNS: width = float
+    """
+    perimeter = RingsLength(xy, offsets)
+    if perimeter <= 0:
+        return 0.0
+    return 2.0 * abs(RingsArea(xy, offsets).sum()) / perimeter
+
+def AdaptiveDensifyRings (xy, offsets, budget, per_width=6, curvature_gain=1.0):
+    """
+    This function resamples rings with vertex spacing adapted to local channel width and bank curvature. \n
+    Spacing is width / per_width, reduced in bends, and scaled up when the total count exceeds the vertex budget. \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t budget = maximal total number of vertices \n
+    \t per_width = number of vertices per channel width on straight banks \n
+    \t curvature_gain = refinement of spacing in bends (0 = no refinement) \n
+    RETURNS: xy, offsets of resampled rings (total count of vertices not over budget, ValueError for budget below 5 vertices per ring)
+    """
+    seg = RingSegments(offsets)
+    ring = RingIndex(offsets)
+    d = xy[seg + 1] - xy[seg]
+    length = np.hypot(d[:, 0], d[:, 1])
+    width0 = ChannelWidth(xy, offsets)
+    if width0 <= 0:
+        return xy, offsets
+    #arc length of vertices along their ring
+    step = np.zeros(len(xy))
+    step[seg + 1] = length
+    cum = np.cumsum(step)
+    arc = cum - cum[offsets[:-1]][ring]
+    ring_length = arc[offsets[1:] - 1]
+
+    #coarse regular samples for local width and curvature
+    h0 = width0 / 4.0
+    samples = []
+    for r in range(len(offsets) - 1):
+        n = max(int(ring_length[r] / h0), 8)
+        t = np.arange(n) * (ring_length[r] / n)
+        a, b = offsets[r], offsets[r + 1]
+        samples.append(np.column_stack((np.interp(t, arc[a:b], xy[a:b, 0]), np.interp(t, arc[a:b], xy[a:b, 1]), t, np.full(n, r))))
+    samples = np.vstack(samples)
+    pts = samples[:, :2]
+    pos = samples[:, 2]
+    sring = samples[:, 3].astype(np.int64)
+    start = np.searchsorted(sring, np.arange(len(offsets)))
+    h = ring_length[sring] / np.diff(start)[sring]
+    nxt = np.arange(len(pts)) + 1
+    nxt[start[1:] - 1] = start[:-1]
+    prv = np.arange(len(pts)) - 1
+    prv[start[:-1]] = start[1:] - 1
+    v1 = pts - pts[prv]
+    v2 = pts[nxt] - pts
+    turn = np.abs(np.arctan2(v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0], (v1 * v2).sum(1)))
+    curvature = turn / h
+
+    k = min(24, len(pts))
+    dist, near = cKDTree(pts).query(pts, k)
+    dist = dist.reshape(len(pts), -1)
+    near = near.reshape(len(pts), -1)
+    gap = np.abs(pos[near] - pos[:, None])
+    gap = np.minimum(gap, ring_length[sring][:, None] - gap)
+    other = (sring[near] != sring[:, None]) | (gap > 2.0 * dist + h[:, None])
+    width = np.where(other, dist, np.inf).min(1)
+    width[~np.isfinite(width)] = width0
+
+    spacing = width / per_width / (1.0 + curvature_gain * curvature * width)
+    spacing = np.maximum(spacing, width0 / (25.0 * per_width))
+    count = (h / spacing).sum()
+    if count > budget:
+        spacing *= count / budget
+
+    #vertex count of rings: 4 vertices and closing vertex at least, vertices over 4 scaled to the rest of budget
+    rings = len(offsets) - 1
+    if 5 * rings > budget:
+        raise ValueError("vertex budget {} is lower than 5 vertices for each of {} rings".format(budget, rings))
+    extra = np.maximum(np.bincount(sring, h / spacing, rings) - 4.0, 0.0)
+    free = budget - 5 * rings
+    if extra.sum() > free:
+        extra *= free / extra.sum()
+    #largest remainders rounded up, total count not over budget
+    whole = np.floor(extra).astype(np.int64)
+    remain = int(min(free, round(extra.sum()))) - whole.sum()
+    if remain > 0:
+        whole[np.argsort(whole - extra, kind="mergesort")[:remain]] += 1
+    ring_count = whole + 4
+
+    #place vertices by integral of vertex density along the ring
+    new_xy = []
+    new_offsets = [0]
+    for r in range(rings):
+        a, b = offsets[r], offsets[r + 1]
+        density = h[start[r]:start[r + 1]] / spacing[start[r]:start[r + 1]]
+        knots = np.concatenate(([0.0], np.cumsum(density)))
+        knot_pos = np.concatenate((pos[start[r]:start[r + 1]], [ring_length[r]]))
+        n = int(ring_count[r])
+        t = np.interp(np.arange(n) * (knots[-1] / n), knots, knot_pos)
+        part = np.column_stack((np.interp(t, arc[a:b], xy[a:b, 0]), np.interp(t, arc[a:b], xy[a:b, 1])))
+        new_xy.append(np.vstack((part, part[:1])))
+        new_offsets.append(new_offsets[-1] + n + 1)
+    return np.vstack(new_xy), np.array(new_offsets, dtype=np.int64)
+
+def UniqueRows (pts):
+    """
+    This function finds unique coordinate pairs. \n
+    Vars:\n
+    \t pts = array (n, 2) of coordinates \n
+    RETURNS: first = index of first occurrence of every unique pair; inverse = index of unique pair for every row
+    """
+    pts = np.ascontiguousarray(pts, dtype=np.float64) + 0.0
+    keys = pts.view(np.dtype((np.void, pts.dtype.itemsize * 2))).ravel()
+    keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+# Point in polygon DEF
+def PointInRings (pts, xy, offsets, chunk=2000000):
+    """
+    This function tests location of points inside the polygon (even-odd rule, holes are outside). \n
+    Segments are binned along the long axis of the polygon and every point is tested only with segments of its bin. \n
+    Vars:\n
+    \t pts = array (n, 2) of points \n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t chunk = maximal number of point-segment pairs tested at once \n
+    RETURNS: inside = boolean array
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    inside = np.zeros(len(pts), dtype=bool)
+    seg = RingSegments(offsets)
+    if len(pts) == 0 or len(seg) == 0:
+        return inside
+    a = xy[seg]
+    b = xy[seg + 1]
+    p = pts
+    span = xy.max(0) - xy.min(0)
+    if span[0] > span[1]:
+        #bins along the long axis, ray along the short axis
+        a = a[:, ::-1]
+        b = b[:, ::-1]
+        p = p[:, ::-1]
+    keep = a[:, 1] != b[:, 1]
+    a = a[keep]
+    b = b[keep]
+    ylo = np.minimum(a[:, 1], b[:, 1])
+    yhi = np.maximum(a[:, 1], b[:, 1])
+    ymin = ylo.min()
+    ymax = yhi.max()
+    nbins = int(max(1, min(4096, len(a) // 8)))
+    h = (ymax - ymin) / nbins
+    if h <= 0:
+        return inside
+    b0 = np.clip(((ylo - ymin) / h).astype(np.int64), 0, nbins - 1)
+    b1 = np.clip(((yhi - ymin) / h).astype(np.int64), 0, nbins - 1)
+    reps = b1 - b0 + 1
+    seg_of = np.repeat(np.arange(len(a)), reps)
+    bin_of = np.repeat(b0, reps) + (np.arange(reps.sum()) - np.repeat(np.cumsum(reps) - reps, reps))
+    order = np.argsort(bin_of, kind="mergesort")
+    seg_of = seg_of[order]
+    seg_start = np.searchsorted(bin_of[order], np.arange(nbins + 1))
+    valid = np.nonzero((p[:, 1] >= ymin) & (p[:, 1] <= ymax))[0]
+    pbin = np.clip(((p[valid, 1] - ymin) / h).astype(np.int64), 0, nbins - 1)
+    order = np.argsort(pbin, kind="mergesort")
+    valid = valid[order]
+    pnt_start = np.searchsorted(pbin[order], np.arange(nbins + 1))
+    x0, y0 = a[:, 0], a[:, 1]
+    slope = (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1])
+    for k in np.nonzero(np.diff(pnt_start))[0]:
+        s = seg_of[seg_start[k]:seg_start[k + 1]]
+        pi = valid[pnt_start[k]:pnt_start[k + 1]]
+        if len(s) == 0:
+            continue
+        step = max(1, chunk // len(s))
+        for c in range(0, len(pi), step):
+            q = pi[c:c + step]
+            px = p[q, 0][:, None]
+            py = p[q, 1][:, None]
+            cross = (y0[s] > py) != (b[s, 1] > py)
+            xint = x0[s] + (py - y0[s]) * slope[s]
+            inside[q] = (np.count_nonzero(cross & (px < xint), axis=1) % 2) == 1
+    return inside
+
+# Nearest boundary DEF
+def NearestBoundary (pts, xy, offsets, tree=None):
+    """
+    This function finds the nearest location on the polygon boundary for every point. \n
+    Vars:\n
+    \t pts = array (n, 2) of points \n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tree = optional cKDTree of xy \n
+    RETURNS: near = array (n, 2) of nearest boundary locations; dist = array of distances
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    if tree is None:
+        tree = cKDTree(xy)
+    dist, v = tree.query(pts)
+    v = np.asarray(v, dtype=np.int64)
+    near = xy[v].copy()
+    is_start = np.zeros(len(xy), dtype=bool)
+    is_start[RingSegments(offsets)] = True
+    #segments ending and starting in the nearest vertex
+    for first, valid in ((v - 1, is_start[np.maximum(v - 1, 0)] & (v > 0)), (v, is_start[v])):
+        q = np.nonzero(valid)[0]
+        a = xy[first[q]]
+        d = xy[first[q] + 1] - a
+        dd = (d * d).sum(1)
+        dd[dd == 0] = 1.0
+        t = np.clip(((pts[q] - a) * d).sum(1) / dd, 0.0, 1.0)
+        proj = a + d * t[:, None]
+        pd = np.hypot(proj[:, 0] - pts[q, 0], proj[:, 1] - pts[q, 1])
+        better = pd < dist[q]
+        near[q[better]] = proj[better]
+        dist[q[better]] = pd[better]
+    return near, dist
+
+# Nearest segment DEF
+def NearestOnSegments (pts, xy, offsets, max_length=None, with_tangent=False):
+    """
+    This function finds the nearest location on the ring (path) segments for every point (segment spatial index). \n
+    Segments are indexed by cKDTree of midpoints, candidates of the point are segments with midpoint closer than \n
+    distance to the nearest midpoint plus half of the longest segment. \n
+    Vars:\n
+    \t pts = array (n, 2) of points \n
+    \t xy = ring (path) vertices \n
+    \t offsets = ring (path) start indices \n
+    \t max_length = optional maximal length of segments (longer segments split, less candidates) \n
+    \t with_tangent = also return direction of the line in the nearest location \n
+    RETURNS: near = array (n, 2) of nearest locations; dist = array of distances; \n
+    \t tangent = array (n, 2), sum of unit directions of all nearest segments (both segments of the nearest vertex)
+    """
+    pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+    if max_length is not None:
+        xy, offsets = DensifyRings(xy, offsets, max_length)
+    seg = RingSegments(offsets)
+    a = xy[seg]
+    d = xy[seg + 1] - a
+    half = 0.5 * np.hypot(d[:, 0], d[:, 1]).max()
+    tree = cKDTree(a + 0.5 * d)
+    bound = tree.query(pts)[0] + half
+    #candidate segments of every point
+    candidates = tree.query_ball_point(pts, bound + 1e-9 * (1.0 + bound))
+    count = np.array([len(c) for c in candidates], dtype=np.int64)
+    point = np.repeat(np.arange(len(pts)), count)
+    s = np.concatenate([np.asarray(c, dtype=np.int64) for c in candidates]) if len(pts) > 0 else np.zeros(0, dtype=np.int64)
+    dd = (d[s] * d[s]).sum(1)
+    t = np.clip(((pts[point] - a[s]) * d[s]).sum(1) / np.where(dd > 0, dd, 1.0), 0.0, 1.0)
+    proj = a[s] + d[s] * t[:, None]
+    dist = np.hypot(proj[:, 0] - pts[point, 0], proj[:, 1] - pts[point, 1])
+    #the nearest candidate of every point
+    order = np.lexsort((dist, point))
+    first = np.cumsum(count) - count
+    best = order[first]
+    if not with_tangent:
+        return proj[best], dist[best]
+    #segments with the same distance as the nearest one (nearest location in the shared vertex)
+    same = dist <= dist[best][point] + 1e-9 * (1.0 + dist[best][point])
+    unit = d[s] / np.sqrt(np.where(dd > 0, dd, 1.0))[:, None] * same[:, None]
+    tangent = np.column_stack((np.bincount(point, unit[:, 0], len(pts)), np.bincount(point, unit[:, 1], len(pts))))
+    return proj[best], dist[best], tangent
+
+# Side of line DEF
+def SideOfLine (pts, xy, offsets, max_length=None):
+    """
+    This function finds side of the points to the nearest segment of the lines (sign of cross product of the line \n
+    direction and vector to the point). Nearest location and direction are given by NearestOnSegments. \n
+    Vars:\n
+    \t pts = array (n, 2) of points \n
+    \t xy = path vertices \n
+    \t offsets = path start indices \n
+    \t max_length = optional maximal length of segments for the search of the nearest segment \n
+    RETURNS: side = array of 1 (LEFT), -1 (RIGHT) or 0 (point on the line or side not defined)
+    """
+    pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+    near, dist, tangent = NearestOnSegments(pts, xy, offsets, max_length, True)
+    cross = tangent[:, 0] * (pts[:, 1] - near[:, 1]) - tangent[:, 1] * (pts[:, 0] - near[:, 0])
+    return np.sign(cross).astype(np.int64)
+
+# Voronoi skeleton DEF
+def VoronoiSkeleton (xy, offsets):
+    """
+    This function builds the Voronoi diagram of the densified boundary vertices and keeps interior edges only. \n
+    Edges between neighbouring boundary vertices (crossing the bank line) and edges outside the polygon are removed. \n
+    Vars:\n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    RETURNS: nodes = array (n, 2) of skeleton nodes; edges = array (m, 2) of node indices
+    """
+    seg = RingSegments(offsets)
+    ring = RingIndex(offsets)[seg]
+    pts = xy[seg]
+    #remove duplicate vertices (Voronoi generators must be unique)
+    first, inverse = UniqueRows(pts)
+    vor = Voronoi(pts[first])
+    gen = first[vor.ridge_points]
+    ridges = np.asarray(vor.ridge_vertices, dtype=np.int64).reshape(-1, 2)
+
+    #neighbouring generators on the same ring
+    size = np.bincount(ring)[ring[gen[:, 0]]]
+    gap = np.abs(gen[:, 0] - gen[:, 1])
+    adjacent = (ring[gen[:, 0]] == ring[gen[:, 1]]) & ((gap == 1) | (gap == size - 1))
+
+    keep = (ridges >= 0).all(1) & ~adjacent
+    inside = PointInRings(vor.vertices, xy, offsets)
+    keep[keep] = inside[ridges[keep, 0]] & inside[ridges[keep, 1]]
+    edges = ridges[keep]
+
+    used, edges = np.unique(edges, return_inverse=True)
+    return vor.vertices[used], edges.reshape(-1, 2)
+
+# Angle filter DEF
+def BankAngleDifference (a, b, xy, offsets, tree=None):
+    """
+    This function compares orientation of lines with orientation of the line to the nearest bank location (as NEAR_ANGLE). \n
+    Both angles are folded to the range 0 - 180 degrees. \n
+    Vars:\n
+    \t a = array (n, 2) of first points of lines \n
+    \t b = array (n, 2) of last points of lines \n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tree = optional cKDTree of xy \n
+    RETURNS: diff = array of angle differences in degrees
+    """
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 2)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 2)
+    angle = np.mod(np.degrees(np.arctan2(b[:, 1] - a[:, 1], b[:, 0] - a[:, 0])), 180.0)
+    near_a, dist_a = NearestBoundary(a, xy, offsets, tree)
+    near_b, dist_b = NearestBoundary(b, xy, offsets, tree)
+    closer = (dist_a <= dist_b)[:, None]
+    src = np.where(closer, a, b)
+    dst = np.where(closer, near_a, near_b)
+    near_angle = np.mod(np.degrees(np.arctan2(dst[:, 1] - src[:, 1], dst[:, 0] - src[:, 0])), 180.0)
+    return np.abs(angle - near_angle)
+
+def AngleFilter (nodes, edges, xy, offsets, tree=None, min_diff=50, max_diff=130):
+    """
+    This function removes skeleton edges perpendicular to channel banks. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tree = optional cKDTree of xy \n
+    \t min_diff, max_diff = kept range of angle difference in degrees \n
+    RETURNS: edges = surviving edges
+    """
+    if len(edges) == 0:
+        return edges
+    diff = BankAngleDifference(nodes[edges[:, 0]], nodes[edges[:, 1]], xy, offsets, tree)
+    return edges[(diff > min_diff) & (diff < max_diff)]
+
+# Graph DEF
+def NodeDegree (n_nodes, edges):
+    """
+    This function counts edges connected to every node. \n
+    Vars:\n
+    \t n_nodes = number of nodes \n
+    \t edges = edges (node indices) \n
+    RETURNS: degree = array
+    """
+    return np.bincount(edges.ravel(), minlength=n_nodes)
+
+def Components (n_nodes, edges):
+    """
+    This function labels connected parts of the skeleton. \n
+    Vars:\n
+    \t n_nodes = number of nodes \n
+    \t edges = edges (node indices) \n
+    RETURNS: label = component label of every node
+    """
+    graph = coo_matrix((np.ones(len(edges)), (edges[:, 0], edges[:, 1])), shape=(n_nodes, n_nodes))
+    return connected_components(graph, directed=False)[1]
+
+def SkeletonPaths (n_nodes, edges, with_edges=False):
+    """
+    This function splits the skeleton to paths between junctions and end nodes. \n
+    Vars:\n
+    \t n_nodes = number of nodes \n
+    \t edges = edges (node indices) \n
+    \t with_edges = return also edge indices of every path \n
+    RETURNS: paths = list of node index arrays (and list of edge index arrays)
+    """
+    degree = NodeDegree(n_nodes, edges)
+    ends = np.concatenate((edges[:, 0], edges[:, 1]))
+    other = np.concatenate((edges[:, 1], edges[:, 0]))
+    edge_id = np.concatenate((np.arange(len(edges)), np.arange(len(edges))))
+    order = np.argsort(ends, kind="mergesort")
+    other = other[order]
+    edge_id = edge_id[order]
+    start = np.searchsorted(ends[order], np.arange(n_nodes + 1))
+    visited = np.zeros(len(edges), dtype=bool)
+    paths = []
+    path_edges = []
+
+    def walk(node, k):
+        path = [node]
+        ids = []
+        while True:
+            visited[edge_id[k]] = True
+            ids.append(edge_id[k])
+            node = other[k]
+            path.append(node)
+            if degree[node] != 2:
+                break
+            nxt = [j for j in range(start[node], start[node + 1]) if not visited[edge_id[j]]]
+            if len(nxt) == 0:
+                break
+            k = nxt[0]
+        paths.append(np.array(path))
+        path_edges.append(np.array(ids, dtype=np.int64))
+
+    for node in np.nonzero((degree > 0) & (degree != 2))[0]:
+        for k in range(start[node], start[node + 1]):
+            if not visited[edge_id[k]]:
+                walk(node, k)
+    #closed loops without junctions
+    for e in np.nonzero(~visited)[0]:
+        if not visited[e]:
+            node = edges[e, 0]
+            k = [j for j in range(start[node], start[node + 1]) if edge_id[j] == e][0]
+            walk(node, k)
+    if with_edges:
+        return paths, path_edges
+    return paths
+
+def LinesToGraph (xy, offsets, precision=0.0):
+    """
+    This function converts lines to skeleton graph, vertices with the same coordinates share one node. \n
+    Vars:\n
+    \t xy = line vertices \n
+    \t offsets = line (path) start indices \n
+    \t precision = optional rounding of coordinates before matching of vertices \n
+    RETURNS: nodes = array (n, 2) of nodes; edges = array (m, 2) of node indices
+    """
+    seg = RingSegments(offsets)
+    keys = np.round(xy / precision) if precision > 0 else xy
+    first, inverse = UniqueRows(keys)
+    edges = np.column_stack((inverse[seg], inverse[seg + 1]))
+    edges = np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1)
+    if len(edges) > 0:
+        edges = edges[UniqueRows(edges)[0]].astype(np.int64)
+    return xy[first], edges.reshape(-1, 2)
+
+# Clean skeleton DEF
+def CleanSkeleton (nodes, edges, tolerance, min_vertices=4):
+    """
+    This function cleans centerline from small unconnected lines and joins close line ends. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t tolerance = distance for joining line ends (as Integrate) \n
+    \t min_vertices = minimal number of vertices of the unconnected line \n
+    RETURNS: edges = cleaned edges
+    """
+    if len(edges) == 0:
+        return edges
+    label = Components(len(nodes), edges)
+    count = np.bincount(label[edges[:, 0]], minlength=label.max() + 1)
+    edges = edges[count[label[edges[:, 0]]] >= min_vertices - 1]
+    if len(edges) == 0 or tolerance <= 0:
+        return edges
+
+    #join line ends of separated parts closer than tolerance
+    label = Components(len(nodes), edges)
+    used = np.unique(edges)
+    dangles = used[NodeDegree(len(nodes), edges)[used] == 1]
+    tree = cKDTree(nodes[used])
+    bridges = []
+    for node, near in zip(dangles, tree.query_ball_point(nodes[dangles], tolerance)):
+        near = used[np.asarray(near, dtype=np.int64)]
+        near = near[label[near] != label[node]]
+        if len(near) > 0:
+            d = np.hypot(nodes[near, 0] - nodes[node, 0], nodes[near, 1] - nodes[node, 1])
+            bridges.append((node, near[np.argmin(d)]))
+    if len(bridges) > 0:
+        edges = np.vstack((edges, np.array(bridges, dtype=np.int64)))
+    return edges
+
+# Prune skeleton DEF
+def EdgeLength (nodes, edges):
+    """
+    This function calculates length of skeleton edges. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    RETURNS: length = array
+    """
+    d = nodes[edges[:, 1]] - nodes[edges[:, 0]]
+    return np.hypot(d[:, 0], d[:, 1])
+
+def LongestPath (nodes, edges):
+    """
+    This function extracts the main channel path: the longest path of the longest connected part. \n
+    Path ends are found by two shortest path searches (exact for tree skeletons). \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    RETURNS: edges = edges of the main path
+    """
+    n = len(nodes)
+    length = EdgeLength(nodes, edges)
+    graph = coo_matrix((np.maximum(length, 1e-12), (edges[:, 0], edges[:, 1])), shape=(n, n)).tocsr()
+    label = Components(n, edges)
+    total = np.bincount(label[edges[:, 0]], length, minlength=label.max() + 1)
+    start = edges[label[edges[:, 0]] == np.argmax(total), 0][0]
+    dist = dijkstra(graph, directed=False, indices=start)
+    dist[~np.isfinite(dist)] = -1
+    u = np.argmax(dist)
+    dist, pred = dijkstra(graph, directed=False, indices=u, return_predecessors=True)
+    dist[~np.isfinite(dist)] = -1
+    v = np.argmax(dist)
+    path = [v]
+    while path[-1] != u:
+        path.append(pred[path[-1]])
+    path = np.array(path, dtype=np.int64)
+    return np.column_stack((path[:-1], path[1:]))
+
+def PruneSkeleton (nodes, edges, min_length, keep_longest=False):
+    """
+    This function removes short side branches of the skeleton (graph of nodes and edges in integer arrays). \n
+    Terminal branches (end node - junction) shorter than min_length are removed repeatedly until no branch is removed. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t min_length = minimal length of terminal branch \n
+    \t keep_longest = keep only the main channel path (longest path of the skeleton) \n
+    RETURNS: edges = pruned edges
+    """
+    while min_length > 0 and len(edges) > 0:
+        degree = NodeDegree(len(nodes), edges)
+        paths, path_edges = SkeletonPaths(len(nodes), edges, True)
+        length = EdgeLength(nodes, edges)
+        remove = np.zeros(len(edges), dtype=bool)
+        for path, ids in zip(paths, path_edges):
+            d0 = degree[path[0]]
+            d1 = degree[path[-1]]
+            terminal = (d0 == 1 and d1 >= 3) or (d1 == 1 and d0 >= 3)
+            if terminal and length[ids].sum() < min_length:
+                remove[ids] = True
+        if not remove.any():
+            break
+        edges = edges[~remove]
+    if keep_longest and len(edges) > 0:
+        edges = LongestPath(nodes, edges)
+    return edges
+
+def GroupPaths (nodes, edges, paths, lines):
+    """
+    This function groups centerline paths by connected parts of the skeleton. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t paths = list of node index arrays \n
+    \t lines = list of coordinate arrays of paths \n
+    RETURNS: parts = list of centerline parts, every part is a list of arrays (k, 2) of coordinates
+    """
+    label = Components(len(nodes), edges)
+    parts = {}
+    for path, line in zip(paths, lines):
+        parts.setdefault(label[path[0]], []).append(line)
+    return [parts[key] for key in sorted(parts)]
+
+# Extend line DEF
+def RayToBoundary (origins, directions, xy, offsets, chunk=2000000):
+    """
+    This function finds the first intersection of rays with the polygon boundary. \n
+    Vars:\n
+    \t origins = array (n, 2) of ray origins \n
+    \t directions = array (n, 2) of ray directions \n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t chunk = maximal number of ray-segment pairs tested at once \n
+    RETURNS: hits = array (n, 2) of intersection points (nan if there is no intersection)
+    """
+    origins = np.asarray(origins, dtype=np.float64)
+    directions = np.asarray(directions, dtype=np.float64)
+    hits = np.full(origins.shape, np.nan)
+    seg = RingSegments(offsets)
+    if len(origins) == 0 or len(seg) == 0:
+        return hits
+    a = xy[seg]
+    s = xy[seg + 1] - a
+    step = max(1, chunk // len(seg))
+    for c in range(0, len(origins), step):
+        o = origins[c:c + step][:, None, :]
+        r = directions[c:c + step][:, None, :]
+        denom = r[..., 0] * s[None, :, 1] - r[..., 1] * s[None, :, 0]
+        ao = a[None, :, :] - o
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = (ao[..., 0] * s[None, :, 1] - ao[..., 1] * s[None, :, 0]) / denom
+            u = (ao[..., 0] * r[..., 1] - ao[..., 1] * r[..., 0]) / denom
+        valid = (denom != 0) & (t > 0) & (u >= 0) & (u <= 1)
+        t = np.where(valid, t, np.inf)
+        best = t.min(1)
+        found = np.isfinite(best)
+        hits[c:c + step][found] = origins[c:c + step][found] + directions[c:c + step][found] * best[found][:, None]
+    return hits
+
+def ExtendPaths (nodes, edges, paths, xy, offsets):
+    """
+    This function converts paths to coordinates and extends dangling ends to the polygon boundary (as ExtendLine). \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t paths = list of node index arrays \n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    RETURNS: lines = list of arrays (k, 2) of path coordinates
+    """
+    degree = NodeDegree(len(nodes), edges)
+    origins = []
+    directions = []
+    where = []
+    for n, path in enumerate(paths):
+        if len(path) < 2:
+            continue
+        for end, prev, pos in ((path[0], path[1], 0), (path[-1], path[-2], -1)):
+            if degree[end] == 1:
+                origins.append(nodes[end])
+                directions.append(nodes[end] - nodes[prev])
+                where.append((n, pos))
+    hits = RayToBoundary(np.array(origins).reshape(-1, 2), np.array(directions).reshape(-1, 2), xy, offsets)
+    lines = [nodes[path] for path in paths]
+    for (n, pos), hit in zip(where, hits):
+        if np.isnan(hit[0]):
+            continue
+        if pos == 0:
+            lines[n] = np.vstack((hit, lines[n]))
+        else:
+            lines[n] = np.vstack((lines[n], hit))
+    return lines
+
+# Centerline DEF
+def RawSkeleton (xy, offsets, min_diff=50, max_diff=130, tree=None):
+    """
+    This function calculates raw skeleton of the densified polygon: interior Voronoi edges parallel to banks. \n
+    Vars:\n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t min_diff, max_diff = kept range of angle difference between edge and nearest bank direction \n
+    \t tree = optional cKDTree of xy \n
+    RETURNS: nodes = array (n, 2) of skeleton nodes; edges = array (m, 2) of node indices
+    """
+    if tree is None:
+        tree = cKDTree(xy)
+    nodes, edges = VoronoiSkeleton(xy, offsets)
+    return nodes, AngleFilter(nodes, edges, xy, offsets, tree, min_diff, max_diff)
+
+def FinishSkeleton (nodes, edges, xy, offsets, tolerance, min_branch=0.0, keep_longest=False):
+    """
+    This function cleans and prunes the raw skeleton and converts it to centerline extended to the banks. \n
+    Vars:\n
+    \t nodes = skeleton nodes \n
+    \t edges = skeleton edges (node indices) \n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tolerance = distance for joining line ends (density of vertices) \n
+    \t min_branch = minimal length of terminal side branch (0 = no pruning) \n
+    \t keep_longest = keep only the main channel path \n
+    RETURNS: lines = list of centerline parts, every part is a list of arrays (k, 2) of coordinates
+    """
+    edges = CleanSkeleton(nodes, edges, tolerance)
+    edges = PruneSkeleton(nodes, edges, min_branch, keep_longest)
+    if len(edges) == 0:
+        return []
+    paths = SkeletonPaths(len(nodes), edges)
+    lines = ExtendPaths(nodes, edges, paths, xy, offsets)
+    return GroupPaths(nodes, edges, paths, lines)
+
+def SkeletonCenterline (xy, offsets, tolerance, min_diff=50, max_diff=130, min_branch=0.0, keep_longest=False):
+    """
+    This function calculates centerline of the densified polygon in memory. \n
+    Vars:\n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tolerance = distance for joining line ends (density of vertices) \n
+    \t min_diff, max_diff = kept range of angle difference between edge and nearest bank direction \n
+    \t min_branch = minimal length of terminal side branch (0 = no pruning) \n
+    \t keep_longest = keep only the main channel path \n
+    RETURNS: lines = list of centerline parts, every part is a list of arrays (k, 2) of coordinates
+    """
+    nodes, edges = RawSkeleton(xy, offsets, min_diff, max_diff)
+    return FinishSkeleton(nodes, edges, xy, offsets, tolerance, min_branch, keep_longest)
+
+# Tiled centerline DEF
+def LongAxis (xy):
+    """
+    This function finds the long axis of the polygon (principal direction of vertices). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    RETURNS: axis = unit vector
+    """
+    centered = xy - xy.mean(0)
+    u, sv, vt = np.linalg.svd(np.dot(centered.T, centered))
+    return vt[0]
+
+def ClipRingsHalfPlane (xy, offsets, u, value, keep_greater):
+    """
+    This function clips rings by half-plane u >= value or u <= value (Sutherland-Hodgman clipping of every ring). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t u = coordinate of vertices along the clipping axis \n
+    \t value = position of the clipping line \n
+    \t keep_greater = keep part with u >= value (True) or u <= value (False) \n
+    RETURNS: xy, offsets of clipped rings
+    """
+    seg = RingSegments(offsets)
+    inside = u >= value if keep_greater else u <= value
+    in_i = inside[seg]
+    in_j = inside[seg + 1]
+    cross = in_i != in_j
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (value - u[seg]) / (u[seg + 1] - u[seg])
+    inter = xy[seg] + (xy[seg + 1] - xy[seg]) * np.where(cross, t, 0.0)[:, None]
+    count = in_j.astype(np.int64) + cross.astype(np.int64)
+    idx = np.repeat(np.arange(len(seg)), count)
+    k = np.arange(len(idx)) - np.repeat(np.cumsum(count) - count, count)
+    pts = np.where((cross[idx] & (k == 0))[:, None], inter[idx], xy[seg[idx] + 1])
+    ring = RingIndex(offsets)[seg[idx]]
+    counts = np.bincount(ring, minlength=len(offsets) - 1)
+    keep = np.repeat(counts >= 3, counts)
+    pts = pts[keep]
+    counts = counts[counts >= 3]
+    if len(counts) == 0:
+        return np.zeros((0, 2)), np.zeros(1, dtype=np.int64)
+    ends = np.cumsum(counts)
+    pts = np.insert(pts, ends, pts[ends - counts], axis=0)
+    new_offsets = np.concatenate(([0], ends + np.arange(1, len(ends) + 1))).astype(np.int64)
+    return pts, new_offsets
+
+def ClipWindow (xy, offsets, axis, lo, hi):
+    """
+    This function clips rings to window lo <= u <= hi along the axis (rings of one tile). \n
+    Vars:\n
+    \t xy = ring vertices \n
+    \t offsets = ring start indices \n
+    \t axis = long axis (unit vector) \n
+    \t lo, hi = window along the axis \n
+    RETURNS: xy, offsets of clipped rings
+    """
+    txy, toffsets = ClipRingsHalfPlane(xy, offsets, np.dot(xy, axis), lo, True)
+    if len(txy) > 0:
+        txy, toffsets = ClipRingsHalfPlane(txy, toffsets, np.dot(txy, axis), hi, False)
+    return txy, toffsets
+
+def TileSkeleton (txy, toffsets, axis, lo, hi, core_lo, core_hi, tolerance, min_diff=50, max_diff=130):
+    """
+    This function calculates raw skeleton of one tile (window along the long axis) and keeps its core part. \n
+    Vars:\n
+    \t txy = densified ring vertices clipped to the window of the tile (ClipWindow) \n
+    \t toffsets = ring start indices \n
+    \t axis = long axis (unit vector) \n
+    \t lo, hi = window of the tile along the axis (core with overlaps) \n
+    \t core_lo, core_hi = core of the tile, edges with midpoint in the core are kept \n
+    \t tolerance = density of vertices along the cut lines \n
+    \t min_diff, max_diff = kept range of angle difference between edge and nearest bank direction \n
+    RETURNS: segments = array (m, 2, 2) of skeleton edges
+    """
+    if len(txy) == 0:
+        return np.zeros((0, 2, 2))
+    txy, toffsets = DensifyRings(txy, toffsets, tolerance)
+    nodes, edges = RawSkeleton(txy, toffsets, min_diff, max_diff)
+    mid = np.dot(0.5 * (nodes[edges[:, 0]] + nodes[edges[:, 1]]), axis)
+    edges = edges[(mid >= core_lo) & (mid < core_hi)]
+    return np.concatenate((nodes[edges[:, 0]][:, None], nodes[edges[:, 1]][:, None]), axis=1) if len(edges) > 0 else np.zeros((0, 2, 2))
+
+def TileWorker (job_file, out_file):
+    """
+    This function calculates skeleton of one tile in worker process (arrays and settings stored in npz file). \n
+    Vars:\n
+    \t job_file = npz file with rings clipped to the tile (xy, offsets), axis and window of the tile \n
+    \t out_file = npz file for the skeleton edges \n
+    RETURNS: out_file
+    """
+    job = np.load(job_file)
+    w = job["window"]
+    segments = TileSkeleton(job["xy"], job["offsets"], job["axis"], w[0], w[1], w[2], w[3], w[4], w[5], w[6])
+    job.close()
+    np.savez(out_file, segments=segments)
+    return out_file
+
+def TiledSkeletonCenterline (xy, offsets, tolerance, tile_length, overlap, min_diff=50, max_diff=130, min_branch=0.0, keep_longest=False, workers=1):
+    """
+    This function calculates centerline of very long polygon in overlapping tiles along its long axis. \n
+    Skeleton of every tile is cut to the tile core, pieces are stitched in one graph (shared nodes, joined ends) \n
+    and cleaned, pruned and extended as one centerline. Peak memory depends on tile length, not on reach length. \n
+    Vars:\n
+    \t xy = densified ring vertices \n
+    \t offsets = ring start indices \n
+    \t tolerance = distance for joining line ends (density of vertices) \n
+    \t tile_length = length of tile core along the long axis \n
+    \t overlap = overlap of neighbouring tiles (on both sides of the core) \n
+    \t min_diff, max_diff = kept range of angle difference between edge and nearest bank direction \n
+    \t min_branch = minimal length of terminal side branch (0 = no pruning) \n
+    \t keep_longest = keep only the main channel path \n
+    \t workers = number of worker processes for tiles (1 = sequential) \n
+    RETURNS: lines = list of centerline parts, every part is a list of arrays (k, 2) of coordinates
+    """
+    axis = LongAxis(xy)
+    u = np.dot(xy, axis)
+    n_tiles = max(1, int(np.ceil((u.max() - u.min()) / tile_length)))
+    if n_tiles == 1:
+        return SkeletonCenterline(xy, offsets, tolerance, min_diff, max_diff, min_branch, keep_longest)
+    windows = []
+    for k in range(n_tiles):
+        core_lo = u.min() + k * tile_length if k > 0 else -np.inf
+        core_hi = u.min() + (k + 1) * tile_length if k < n_tiles - 1 else np.inf
+        lo = core_lo - overlap if k > 0 else u.min() - 1.0
+        hi = core_hi + overlap if k < n_tiles - 1 else u.max() + 1.0
+        windows.append([lo, hi, core_lo, core_hi, tolerance, min_diff, max_diff])
+
+    if workers > 1:
+        import shutil
+        import tempfile
+        from SCS_parallel import RunPool
+        folder = tempfile.mkdtemp()
+        try:
+            jobs = []
+            for k, window in enumerate(windows):
+                job_file = os.path.join(folder, "tile_{}.npz".format(k))
+                txy, toffsets = ClipWindow(xy, offsets, axis, window[0], window[1])
+                np.savez(job_file, xy=txy, offsets=toffsets, axis=axis, window=np.array(window))
+                jobs.append({"job_file": job_file, "out_file": os.path.join(folder, "edges_{}.npz".format(k))})
+            pieces = []
+            for out_file in RunPool("SCS_skeleton", "TileWorker", jobs, workers):
+                with np.load(out_file) as data:
+                    pieces.append(data["segments"])
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+    else:
+        pieces = []
+        for window in windows:
+            txy, toffsets = ClipWindow(xy, offsets, axis, window[0], window[1])
+            pieces.append(TileSkeleton(txy, toffsets, axis, *window))
+
+    #stitch tiles: edges to one graph with shared nodes
+    segments = np.concatenate(pieces)
+    if len(segments) == 0:
+        return []
+    lxy = segments.reshape(-1, 2)
+    loffsets = np.arange(0, len(lxy) + 1, 2)
+    nodes, edges = LinesToGraph(lxy, loffsets, tolerance / 1000.0)
+    return FinishSkeleton(nodes, edges, xy, offsets, tolerance, min_branch, keep_longest)
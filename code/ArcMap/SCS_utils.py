@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+'''
+Standalone channel shifting toolbox (SCS Toolbox)
+Created on 17 MAY 2024
+Last update on 17 MAY 2024
+@author: Milos Rusnak
+
+@devoloped at: CNRS - UMR5600 Environnement Ville Societe
+               15 Parvis Rene Descartes, BP 7000, 69342 Lyon Cedex 07, France
+
+@contact: geogmilo@savba.sk
+          Institute of geography SAS
+          Stefanikova 49, 814 73 Bratislava, Slovakia
+
+@summary: SCS_utils is an open-source python and arcPy code.
+          Shared helpers of the SCS Toolbox moduls: optional tool parameters, conversion
+          between feature geometries and coordinate arrays (rings/paths with offsets)
+          and filling of hollows in channel polygons
+
+'''
+
+# required libraries and packages
+import os
+import json
+import numpy as np
+import arcpy
+
+from SCS_skeleton import RingIndex, RingsArea
+
+#===============================================================================
+# CODING
+#===============================================================================
+
+# Optional tool parameter DEF
+def GetOptionalParameter (index, default):
+    """
+    This function reads optional parameter of the tool. Parameter missing in the toolbox or left empty returns default value. \n
+    Vars:\n
+    \t index = index of the tool parameter \n
+    \t default = default value, type of the default value is used for conversion of parameter text \n
+    RETURNS: value = value of the parameter
+    """
+    if arcpy.GetArgumentCount() <= index:
+        return default
+    value = arcpy.GetParameterAsText(index)
+    if value in ("", "#"):
+        return default
+    if isinstance(default, bool):
+        return value.lower() in ("true", "1", "yes")
+    if isinstance(default, (int, float)):
+        return type(default)(float(value.replace(",", ".")))
+    return value
+
+# Geometry to arrays DEF
+def GeometryToArrays (geometry):
+    """
+    This function converts polygon or polyline geometry to coordinate arrays. \n
+    Vars:\n
+    \t geometry = arcpy polygon or polyline geometry \n
+    RETURNS: xy = array (n, 2) of vertices of all rings (paths); offsets = start index of every ring (path) and total count of vertices
+    """
+    data = json.loads(geometry.JSON)
+    if "curveRings" in data or "curvePaths" in data:
+        data = json.loads(geometry.densify("ANGLE", 0, 0.01).JSON)
+    rings = data.get("rings", data.get("paths", []))
+    counts = [len(ring) for ring in rings]
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    if offsets[-1] == 0:
+        return np.zeros((0, 2)), offsets
+    xy = np.array([pnt[:2] for ring in rings for pnt in ring], dtype=np.float64)
+    return xy, offsets
+
+# Layer to arrays DEF
+def ReadRings (layer, where=None):
+    """
+    This function reads all rings (paths) of the layer to one coordinate array. \n
+    Vars:\n
+    \t layer = polygon or polyline layer \n
+    \t where = optional SQL selection of features \n
+    RETURNS: xy = array (n, 2) of vertices; offsets = ring (path) start index; feature = index of feature (row) for every ring (path)
+    """
+    xy_list = []
+    offsets_list = [np.zeros(1, dtype=np.int64)]
+    feature_list = []
+    total = 0
+    with arcpy.da.SearchCursor(layer, ["SHAPE@"], where) as cursor:
+        for n, row in enumerate(cursor):
+            if row[0] is None:
+                continue
+            xy, offsets = GeometryToArrays(row[0])
+            xy_list.append(xy)
+            offsets_list.append(offsets[1:] + total)
+            feature_list.append(np.full(len(offsets) - 1, n, dtype=np.int64))
+            total += len(xy)
+    if total == 0:
+        return np.zeros((0, 2)), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(xy_list), np.concatenate(offsets_list), np.concatenate(feature_list)
+
+# Arrays to geometry DEF
+def ArraysToGeometry (parts, geometry_type):
+    """
+    This function converts list of coordinate arrays to one geometry. \n
+    Vars:\n
+    \t parts = list of arrays (n, 2), closed rings for polygon or paths for polyline \n
+    \t geometry_type = "POLYGON" or "POLYLINE" \n
+    RETURNS: geometry = arcpy geometry
+    """
+    key = "rings" if geometry_type.upper() == "POLYGON" else "paths"
+    data = {key: [np.asarray(part, dtype=np.float64).tolist() for part in parts]}
+    return arcpy.AsShape(data, True)
+
+# Bulk write DEF
+def WriteGeometries (out_fc, geometry_type, spatial_reference, geometries, fields=None, rows=None):
+    """
+    This function writes geometries and their attributes to new feature class with one insert cursor. \n
+    Vars:\n
+    \t out_fc = output feature class (path or name in the workspace) \n
+    \t geometry_type = "POLYGON", "POLYLINE" or "POINT" \n
+    \t spatial_reference = spatial reference of the output \n
+    \t geometries = list of arcpy geometries \n
+    \t fields = optional list of (name, type) of attribute fields \n
+    \t rows = optional list of attribute values for every geometry \n
+    RETURNS: out_fc = output feature class
+    """
+    fields = fields or []
+    out_fc = out_fc.replace("%ScratchWorkspace%", arcpy.env.scratchWorkspace or arcpy.env.scratchGDB)
+    folder, name = os.path.split(out_fc)
+    if folder == "":
+        folder = arcpy.env.workspace
+    if os.path.splitext(name)[1] == "" and arcpy.Describe(folder).workspaceType == "FileSystem":
+        #feature class in folder is shapefile
+        name = name + ".shp"
+        out_fc = os.path.join(folder, name)
+    arcpy.management.CreateFeatureclass(folder, name, geometry_type.upper(), "", "", "", spatial_reference)
+    for field_name, field_type in fields:
+        arcpy.management.AddField(out_fc, field_name, field_type)
+    names = ["SHAPE@"] + [field_name for field_name, field_type in fields]
+    with arcpy.da.InsertCursor(out_fc, names) as cursor:
+        for n in range(len(geometries)):
+            values = list(rows[n]) if rows is not None else []
+            cursor.insertRow([geometries[n]] + values)
+    return out_fc
+
+# Fill hollows DEF
+def FillHollows (layer, out_fc, spatial_reference):
+    """
+    This function creates channel polygons without hollows (only exterior rings of every part are kept). \n
+    Every feature of the layer is one polygon of the output, all polygons are written at once. \n
+    Vars:\n
+    \t layer = polygon layer \n
+    \t out_fc = output feature class \n
+    \t spatial_reference = spatial reference of the output \n
+    RETURNS: out_fc = output feature class
+    """
+    xy, offsets, feature = ReadRings(layer)
+    #exterior rings are clockwise (negative area), hollows are counterclockwise
+    ring = RingIndex(offsets)
+    area = RingsArea(xy - xy[offsets[:-1]][ring], offsets)
+    exterior = np.nonzero(area < 0)[0]
+    polygons = []
+    starts = np.flatnonzero(np.diff(feature[exterior])) + 1
+    for rings in np.split(exterior, starts) if len(exterior) > 0 else []:
+        polygons.append(ArraysToGeometry([xy[offsets[r]:offsets[r + 1]] for r in rings], "POLYGON"))
+    return WriteGeometries(out_fc, "POLYGON", spatial_reference, polygons)
+
+# Cascaded union DEF
+def CascadedUnion (geometries):
+    """
+    This function merges geometries by union of pairs in rounds (balanced tree of unions instead of one growing geometry). \n
+    Vars:\n
+    \t geometries = list of arcpy geometries \n
+    RETURNS: geometry = union of all geometries (None for empty list)
+    """
+    geometries = [geometry for geometry in geometries if geometry is not None]
+    while len(geometries) > 1:
+        merged = [geometries[n].union(geometries[n + 1]) for n in range(0, len(geometries) - 1, 2)]
+        if len(geometries) % 2 == 1:
+            merged.append(geometries[-1])
+        geometries = merged
+    return geometries[0] if len(geometries) > 0 else None
+
+# Attribute dissolve DEF
+def DissolveFields (layer, levels, spatial_reference):
+    """
+    This function dissolves features by values of fields (groups of hash table of field values merged by cascaded union). \n
+    All levels are calculated in one reading of the layer, coarse level merges geometries of the finer level. \n
+    Vars:\n
+    \t layer = input polygon layer \n
+    \t levels = list of (out_fc, fields) from fine to coarse, fields of every level are subset of fields of previous level \n
+    \t spatial_reference = spatial reference of outputs \n
+    RETURNS: outputs = list of output feature classes of the levels
+    """
+    types = dict(FieldTypes(layer))
+    fine = levels[0][1]
+    groups = {}
+    with arcpy.da.SearchCursor(layer, ["SHAPE@"] + list(fine)) as cursor:
+        for row in cursor:
+            if row[0] is None:
+                continue
+            groups.setdefault(tuple(row[1:]), []).append(row[0])
+    outputs = []
+    parent = list(fine)
+    for out_fc, fields in levels:
+        index = [parent.index(field) for field in fields]
+        merged = {}
+        for key, geometries in groups.items():
+            merged.setdefault(tuple(key[n] for n in index), []).extend(geometries)
+        keys = sorted(merged)
+        geometries = [CascadedUnion(merged[key]) for key in keys]
+        outputs.append(WriteGeometries(out_fc, "POLYGON", spatial_reference, geometries, [(field, types[field]) for field in fields], [list(key) for key in keys]))
+        #next level from geometries of this level
+        groups = dict(zip(keys, [[geometry] for geometry in geometries]))
+        parent = list(fields)
+    return outputs
+
+# Field type DEF
+def FieldTypes (layer):
+    """
+    This function lists attribute fields of the layer with field type keyword of AddField. \n
+    Vars:\n
+    \t layer = layer or table \n
+    RETURNS: fields = list of (name, type) of not required fields
+    """
+    keywords = {"Integer": "LONG", "SmallInteger": "SHORT", "Double": "DOUBLE", "Single": "FLOAT", "String": "TEXT", "Date": "DATE"}
+    return [(field.name, keywords[field.type]) for field in arcpy.ListFields(layer) if not field.required and field.type in keywords]